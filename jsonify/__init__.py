@@ -1,5 +1,17 @@
 """Flask jsonify UI wrapper"""
 
 from .jsonify import jsonify as jsonify
+from .jsonify import RawJSON as RawJSON
+from .jsonify import RawFragment as RawFragment
+from .schema import schema as schema
+from .schema import compile_schema as compile_schema
+from .middleware import JsonifyMiddleware as JsonifyMiddleware
+from .telemetry import JsonifyTelemetry as JsonifyTelemetry
+from .metrics import JsonifyMetrics as JsonifyMetrics
+
+try:
+    from .provider import JsonifyProvider as JsonifyProvider
+except ImportError:  # flask < 2.2 has no JSONProvider
+    pass
 
 __version__ = "0.0.1"
\ No newline at end of file
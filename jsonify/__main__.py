@@ -0,0 +1,350 @@
+""" View a local json or ndjson file in the jsonify viewer, no flask app needed
+
+    The file is mmapped and streamed into the viewer page, it's never loaded into python objects.
+    Files over --lazy MiB are sent as a skeleton instead: small values inline, big objects and arrays
+    as placeholders the viewer fetches from the server when they're expanded. The skeleton is found
+    with a regex token scanner over the mmap, nothing is parsed.
+
+    USEAGE:
+        python -m jsonify dump.json                   # serve on http://127.0.0.1:8000
+        python -m jsonify events.ndjson --port 9000   # .ndjson/.jsonl are shown as an array of lines
+        python -m jsonify dump.json -o dump.html      # static page, the whole file inline
+        python -m jsonify huge.json --lazy 0          # skeleton and lazy loading whatever the size
+"""
+
+import argparse
+import http.server
+import itertools
+import json
+import mmap
+import os
+import re
+import sys
+import typing as t
+import urllib.parse
+import webbrowser
+
+from .jsonify import _textarea_escape, _viewer_parts, _wants_html
+
+_CHUNK = 1024 * 1024
+_INLINE = 16 * 1024  # values up to this size are inlined in a skeleton
+_PAGE = 500  # children per skeleton level, the rest is one "more" placeholder
+_LAZY_KEY = "$jsonify_lazy"
+
+# a json string (escapes and all) or a structural character, numbers/literals/whitespace are skipped over
+_TOKENS = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{},:]')
+_STRING_REST = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"')
+_ESCAPE = re.compile(rb"\\.", re.DOTALL)
+# skip() keeps only the brackets of a chunk, as ( and )
+_BRACKETS = bytes.maketrans(b"[{]}", b"(())")
+_NOT_BRACKETS = bytes(sorted(set(range(256)) - set(b"[{]}")))
+_SKIP_CHUNK = 1024 * 1024
+_SKIP_PASSES = 64
+_WHITESPACE = b" \t\r\n"
+_OPEN = b"[{"
+_CLOSE = b"]}"
+
+
+class Document:
+    """ A mmapped json or ndjson file, served as is or as a lazy skeleton """
+
+    def __init__(self, path: str, ndjson: bool = False):
+        self.path = path
+        self.ndjson = ndjson
+        self.stat = None
+        self.open()
+
+    def open(self):
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            # the map keeps its own reference to the file, a replaced file is picked up by refresh()
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+        self.stat = (stat.st_mtime_ns, stat.st_size)
+        self.start = 3 if self.mm[:3] == b"\xef\xbb\xbf" else 0
+        self.end = len(self.mm)
+
+    def refresh(self):
+        """ Re-map the file when it changed on disk, so the viewer's refresh button shows the new data """
+        stat = os.stat(self.path)
+        if (stat.st_mtime_ns, stat.st_size) != self.stat:
+            self.open()
+
+    @property
+    def etag(self) -> str:
+        return '"%x-%x"' % self.stat
+
+    def chunks(self) -> t.Iterator[bytes]:
+        """ The whole document as json, ndjson lines become an array """
+        if not self.ndjson:
+            for pos in range(self.start, self.end, _CHUNK):
+                yield self.mm[pos:min(pos + _CHUNK, self.end)]
+            return
+
+        yield b"["
+        for i, (_, _, s, e) in enumerate(self.lines(self.start, self.end)):
+            if i:
+                yield b","
+            yield self.mm[s:e]
+        yield b"]"
+
+    def skeleton(self) -> t.List[bytes]:
+        """ The top level container with big children replaced by placeholders """
+        if self.ndjson:
+            return self.expand(self.start, self.end, "ndjson")
+        s, e = self.strip(self.start, self.end)
+        if s == e or self.mm[s] not in _OPEN:
+            return [self.mm[s:e]]
+        return self.expand(s + 1, e, _kind(self.mm[s]))
+
+    def subtree(self, start: int, end: int, kind: t.Optional[str] = None, more: bool = False, index: int = 0) -> t.List[bytes]:
+        """ One placeholder's worth: a container expanded one level, or the rest of one ("more") """
+        if not (self.start <= start < end <= self.end):
+            raise ValueError("offsets outside the document")
+        if more:
+            if kind not in ("object", "array", "ndjson"):
+                raise ValueError(f"unknown kind {kind!r}")
+            return self.expand(start, end, kind, index)
+        if self.mm[start] not in _OPEN:
+            raise ValueError("offsets don't point at an object or array")
+        return self.expand(start + 1, end, _kind(self.mm[start]))
+
+    def expand(self, pos: int, end: int, kind: str, index: int = 0) -> t.List[bytes]:
+        """ Children from pos as json, small ones inline and at most _PAGE of them """
+        is_object = kind == "object"
+        out = [b"{" if is_object else b"["]
+        children = self.lines(pos, end) if kind == "ndjson" else self.children(pos, end)
+        for i, (item, key, s, e) in enumerate(children):
+            if i:
+                out.append(b",")
+            if i == _PAGE:
+                more = _placeholder(start=item, end=end, type=kind, more=True, index=index + i)
+                out.append(b'"\\u2026":' + more if is_object else more)
+                break
+            if is_object:
+                out.append(self.mm[key[0]:key[1]] + b":")
+            out.append(self.value(s, e))
+        out.append(b"}" if is_object else b"]")
+        return out
+
+    def value(self, s: int, e: int) -> bytes:
+        if e - s > _INLINE and self.mm[s] in _OPEN:
+            return _placeholder(start=s, end=e, type=_kind(self.mm[s]), bytes=e - s)
+        return self.mm[s:e]
+
+    def children(self, pos: int, end: int) -> t.Iterator[t.Tuple[int, t.Optional[t.Tuple[int, int]], int, int]]:
+        """ (child start, key span, value start, value end) for each direct child, pos is just inside the container
+
+        Nested containers are only counted through, stops at the container's closing bracket.
+        """
+        mm = self.mm
+        item = value = pos
+        key = None
+        while True:
+            match = _TOKENS.search(mm, pos, end)
+            if match is None:
+                return
+            c = mm[match.start()]
+            pos = match.end()
+            if c == 0x2C:  # ,
+                yield (item, key, *self.strip(value, match.start()))
+                item = value = pos
+                key = None
+            elif c == 0x3A:  # :
+                key = self.strip(item, match.start())
+                value = pos
+            elif c in _CLOSE:
+                s, e = self.strip(value, match.start())
+                if s < e:
+                    yield item, key, s, e
+                return
+            elif c in _OPEN:
+                pos = self.skip(pos, end)
+
+    def skip(self, pos: int, end: int) -> int:
+        """ The position just past the container whose opening bracket is right before pos
+
+        Goes a chunk at a time with bytes methods: escapes dropped, strings split out, brackets kept with
+        translate and balanced pairs removed. Only a chunk that may close the container is walked token by token.
+        """
+        mm = self.mm
+        depth = 1
+        in_string = False
+        while pos < end:
+            cut = min(pos + _SKIP_CHUNK, end)
+            while cut < end and mm[cut - 1] == 0x5C:  # never split an escape
+                cut += 1
+            chunk = mm[pos:cut]
+            if b"\\" in chunk:
+                chunk = _ESCAPE.sub(b"", chunk)
+            parts = chunk.split(b'"')
+            brackets = b"".join(parts[1::2] if in_string else parts[::2]).translate(_BRACKETS, _NOT_BRACKETS)
+            for _ in range(_SKIP_PASSES):
+                if b"()" not in brackets:
+                    break
+                brackets = brackets.replace(b"()", b"")
+            else:
+                brackets = b")" * depth  # pathologically nested, walk it
+            # only unbalanced brackets are left, closes first then opens
+            closes = brackets.count(b")")
+            if closes < depth:
+                depth += len(brackets) - 2 * closes
+                in_string ^= len(parts) % 2 == 0
+                pos = cut
+                continue
+
+            if in_string:
+                match = _STRING_REST.match(mm, pos, end)
+                pos = match.end() if match else end
+            for match in _TOKENS.finditer(mm, pos, end):
+                if match.start() >= cut:
+                    pos = match.start()
+                    break
+                c = mm[match.start()]
+                if c in _OPEN:
+                    depth += 1
+                elif c in _CLOSE:
+                    depth -= 1
+                    if depth == 0:
+                        return match.end()
+            else:
+                return end
+            in_string = False
+        return end
+
+    def lines(self, pos: int, end: int) -> t.Iterator[t.Tuple[int, None, int, int]]:
+        """ children() for ndjson, one child per non blank line """
+        while pos < end:
+            newline = self.mm.find(b"\n", pos, end)
+            stop = end if newline < 0 else newline
+            s, e = self.strip(pos, stop)
+            if s < e:
+                yield pos, None, s, e
+            pos = stop + 1
+
+    def strip(self, s: int, e: int) -> t.Tuple[int, int]:
+        mm = self.mm
+        while s < e and mm[s] in _WHITESPACE:
+            s += 1
+        while e > s and mm[e - 1] in _WHITESPACE:
+            e -= 1
+        return s, e
+
+
+def _kind(c: int) -> str:
+    return "object" if c == 0x7B else "array"
+
+
+def _placeholder(**lazy: t.Any) -> bytes:
+    return json.dumps({_LAZY_KEY: lazy}, separators=(",", ":")).encode("utf-8")
+
+
+def _page(document: Document, lazy: bool, max_string: int) -> t.Iterator[bytes]:
+    """ The viewer page around the escaped document """
+    prefix, suffix = _viewer_parts(max_string=max_string, auto_refresh=0.0, select=False, lazy=lazy)
+    body = document.skeleton() if lazy else document.chunks()
+    return itertools.chain((prefix,), map(_textarea_escape, body), (suffix,))
+
+
+def serve(document: Document, host: str, port: int, lazy: bool, max_string: int, open_browser: bool = False):
+    """ The viewer on http://host:port/, json for fetch/X-jsonify, /subtree for lazy placeholders """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+
+            if url.path == "/subtree" and lazy:
+                try:
+                    body = document.subtree(
+                        int(query["start"]), int(query["end"]), query.get("type"), query.get("more") == "1", int(query.get("index", 0))
+                    )
+                except (KeyError, ValueError) as e:
+                    return self.send_error(400, str(e))
+                return self.send(body, "application/json")
+
+            if url.path != "/":
+                return self.send_error(404)
+            document.refresh()
+
+            if "jsonify_download" in query:
+                # the file as it is on disk, nothing to indent without parsing it
+                name = os.path.basename(document.path).replace('"', "")
+                self.send(
+                    (document.mm[p:min(p + _CHUNK, document.end)] for p in range(0, document.end, _CHUNK)),
+                    "application/octet-stream" if document.ndjson else "application/json",
+                    {"Content-Disposition": f'attachment; filename="{name}"'},
+                )
+            elif _wants_html(self.headers):
+                self.send(_page(document, lazy, max_string), "text/html; charset=utf-8")
+            elif self.headers.get("If-None-Match") == document.etag:
+                self.send_response(304)
+                self.send_header("ETag", document.etag)
+                self.end_headers()
+            else:
+                self.send(document.skeleton() if lazy else document.chunks(), "application/json", {"ETag": document.etag})
+
+        def send(self, body: t.Iterable[bytes], content_type: str, headers: t.Optional[dict] = None):
+            # HTTP/1.0, the connection closing ends the body so it can stream without a length
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Vary", "Accept, Content-Type, X-jsonify, User-Agent")
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                for chunk in body:
+                    self.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            sys.stderr.write("%s %s\n" % (self.log_date_time_string(), format % args))
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    url = f"http://{host}:{server.server_address[1]}/"
+    print(f"Serving {document.path}{' (lazy)' if lazy else ''} on {url}  ctrl-c to stop", file=sys.stderr)
+    if open_browser:
+        webbrowser.open(url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def write(document: Document, output: str, max_string: int):
+    """ A static viewer page with the whole document inline, streamed from the map to the file """
+    with open(output, "wb") as f:
+        for chunk in _page(document, False, max_string):
+            f.write(chunk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m jsonify", description=__doc__.split("\n")[0])
+    parser.add_argument("file", help="json or ndjson file")
+    parser.add_argument("-o", "--output", help="write a static html page here instead of serving")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="0 picks a free port")
+    parser.add_argument("--ndjson", action="store_true", default=None, help="one json value per line, default from the extension")
+    parser.add_argument("--lazy", type=float, default=64, help="MiB above which the viewer loads subtrees on demand, 0 always")
+    parser.add_argument("--max-string", type=int, default=500, help="strings longer than this are shortened in the viewer")
+    parser.add_argument("--open", action="store_true", help="open the page in a browser")
+    args = parser.parse_args(argv)
+
+    ndjson = args.ndjson if args.ndjson is not None else args.file.lower().endswith((".ndjson", ".jsonl"))
+    document = Document(args.file, ndjson=ndjson)
+    lazy = document.end - document.start >= args.lazy * 1024 * 1024
+
+    if args.output:
+        if lazy:
+            print(f"warning: {args.file} is over {args.lazy:g} MiB, a static page holds all of it and can't load lazily", file=sys.stderr)
+        write(document, args.output, args.max_string)
+        print(f"Wrote {args.output}", file=sys.stderr)
+        return
+
+    serve(document, args.host, args.port, lazy, args.max_string, args.open)
+
+
+if __name__ == '__main__':
+    main()
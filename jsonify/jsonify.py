@@ -10,7 +10,7 @@
     TODO: minimize the html payload
     TODO: Fix css for line breaks, currently overflow is scroll when it should break if possible.
           - Use white-space: pre-wrap; but I'm unsure if this looks better or not..
-          - firefox's version reduces long strings with "longstring...longstrong" with a toggle
+          - firefox's version reduces long strings with "longstring...longstrong" with a toggle - done, JSONIFY_MAX_STRING
     TODO: check this still works when importing from pip
     
     TODO [optional]: add a pop up for session, headers, cookies
@@ -27,7 +27,7 @@
 
     FireFox does something similar by default:
      - they allow you to condense long strings
-     - they allow you to filter json
+     - they allow you to filter json - done, filter box backed by a worker index
      - They allow you to prettyprint the raw json - should already do this with flask
 
      Other feature are already shared. 
@@ -35,10 +35,517 @@
 
 """
 
+import datetime
+import decimal
+import functools
+import hashlib
+import html as _html
+import itertools
+import json as _json
+import re
+import secrets
+import sys
+import time
 import typing as t
+import uuid
 from os import getenv
 
-from flask import current_app, request, json, render_template, render_template_string
+import jinja2
+from flask import abort, current_app, g, request, json, stream_with_context
+from markupsafe import Markup
+from werkzeug.utils import secure_filename
+
+try:
+    import msgpack
+except ImportError:  # optional, pip install jsonify[msgpack]
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional, pip install jsonify[cbor]
+    cbor2 = None
+
+
+class RawJSON:
+    """ Pre-serialized JSON that jsonify() passes straight through.
+
+    For when the json already exists as bytes (redis, an upstream API, postgres json_agg)
+    and a json.loads/json.dumps round trip would only burn cpu.
+
+        return jsonify(RawJSON(redis.get("users")))
+
+    Accepts bytes, str or memoryview.
+
+    validate:
+        - False: trust the caller (default)
+        - True: cheap check, only looks at the first and last non whitespace characters
+        - "full": json.loads the value, for sources you don't trust
+
+    Data that fails either check is a ValueError (json.JSONDecodeError from "full").
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: t.Union[bytes, str, memoryview], validate: t.Union[bool, str] = False):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif isinstance(data, memoryview):
+            data = data.tobytes()
+        elif not isinstance(data, bytes):
+            raise TypeError(f"RawJSON expects bytes, str or memoryview, not {type(data).__name__}")
+
+        if validate == "full":
+            json.loads(data)
+        elif validate and not _looks_like_json(data):
+            raise ValueError("RawJSON data does not look like json")
+
+        self.data = data
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {len(self.data)} bytes>"
+
+
+class RawFragment(RawJSON):
+    """ Pre-serialized JSON that can sit anywhere inside the data passed to jsonify().
+
+    The envelope is serialized as normal and the fragment's bytes are spliced in at its position.
+
+        cached = RawFragment(redis.get("catalog"))
+        return jsonify(user=g.user.id, catalog=cached)
+
+    The fragment is inserted as is, so with pretty printing on it keeps its own formatting.
+    """
+
+    __slots__ = ()
+
+
+# json.dumps writes each fragment as this placeholder string, then it is swapped for the raw bytes
+_FRAGMENT_TOKEN = f"jsonify-fragment-{secrets.token_hex(8)}-"
+_FRAGMENT_PATTERN = re.compile(f'"{_FRAGMENT_TOKEN}(\\d+)"')
+
+
+def _app_default() -> t.Callable[[t.Any], t.Any]:
+    """ The app's own `default` hook, so Decimal, datetime, uuid etc still work next to fragments """
+    provider = getattr(current_app, "json", None)  # flask >= 2.2
+    if provider is not None:
+        return getattr(provider, "default", _not_serializable)
+    return current_app.json_encoder().default
+
+
+def _json_options() -> t.Tuple[bool, bool]:
+    """ The app's (sort_keys, ensure_ascii), for encoders that don't go through json.dumps """
+    provider = getattr(current_app, "json", None)  # flask >= 2.2
+    if provider is not None:
+        return getattr(provider, "sort_keys", True), getattr(provider, "ensure_ascii", True)
+    return current_app.config.get("JSON_SORT_KEYS", True), current_app.config.get("JSON_AS_ASCII", True)
+
+
+def _not_serializable(o: t.Any) -> t.NoReturn:
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _dumps(data: t.Any, **kwargs: t.Any) -> str:
+    """ json.dumps that splices RawJSON/RawFragment values into the output without re-encoding them """
+    return _splice_dumps(json.dumps, data, _app_default(), **kwargs)
+
+
+def _encode(data: t.Any, indent: t.Optional[int] = None, separators: t.Tuple[str, str] = (",", ":")) -> str:
+    """ _dumps, or the view's compiled schema encoder (see schema.py) when the output is compact and the data matches """
+    encoder = g.get("_jsonify_schema") if indent is None else None
+    if encoder is not None:
+        text = encoder(data)
+        if text is not None:
+            return text
+    return _dumps(data, indent=indent, separators=separators)
+
+
+def _splice_dumps(dumps: t.Callable[..., str], data: t.Any, fallback: t.Callable[[t.Any], t.Any], **kwargs: t.Any) -> str:
+    token, pattern = _FRAGMENT_TOKEN, _FRAGMENT_PATTERN
+    while True:
+        fragments = []
+        text = dumps(data, default=_fragment_default(fallback, fragments, token), **kwargs)
+        if not fragments:
+            return text
+        spliced = _splice(text, fragments, pattern)
+        if spliced is not None:
+            return spliced
+        # a string in the data is a placeholder, again with a token it can't hold
+        token = f"jsonify-fragment-{secrets.token_hex(8)}-"
+        pattern = re.compile(f'"{token}(\\d+)"')
+
+
+def _fragment_default(fallback: t.Callable[[t.Any], t.Any], fragments: t.List[bytes], token: str) -> t.Callable[[t.Any], t.Any]:
+    """ json `default` that writes each RawJSON as a numbered placeholder string and keeps its bytes """
+    def default(o):
+        if isinstance(o, RawJSON):
+            fragments.append(o.data)
+            return f"{token}{len(fragments) - 1}"
+        return fallback(o)
+    return default
+
+
+def _splice(text: str, fragments: t.List[bytes], pattern: t.Pattern[str]) -> t.Optional[str]:
+    """ The placeholders swapped for the fragments, None when there are more of them than fragments """
+    # json.dumps calls default() in output order, anything but 0..n-1 means a string in the data matched
+    if pattern.findall(text) != [str(i) for i in range(len(fragments))]:
+        return None
+    return pattern.sub(lambda m: fragments[int(m.group(1))].decode("utf-8"), text)
+
+
+_STREAM_CHUNK = 64 * 1024
+_WALK_DEPTH = 32  # below this everything is left to json.dumps
+_WALK_MIN = 256  # past the top two levels only containers this big are walked
+
+
+def _iter_dumps(
+    data: t.Any,
+    indent: t.Optional[int] = None,
+    separators: t.Tuple[str, str] = (",", ":"),
+    chunk_size: int = _STREAM_CHUNK,
+    pause: t.Optional[t.Callable[[], t.Any]] = None,
+    end: str = "",
+) -> t.Iterator[bytes]:
+    """ _dumps as ~chunk_size byte chunks, the whole document is never held in memory or serialized in one go
+
+    The outer containers, and any big one further down, are walked here. The values inside them go through
+    json.dumps one at a time, so the C encoder still does the work. Same output as _dumps.
+    pause() is called after every chunk, gevent/eventlet's sleep lets the other greenlets run.
+    """
+    sort_keys, ensure_ascii = _json_options()
+    fallback = _app_default()
+    fragments = []
+    options = dict(sort_keys=sort_keys, ensure_ascii=ensure_ascii, indent=indent, separators=separators)
+    encode = _json.JSONEncoder(default=_fragment_default(fallback, fragments, _FRAGMENT_TOKEN), **options).encode
+
+    def dumps(value):
+        text = encode(value)
+        if fragments:
+            text = _splice(text, fragments, _FRAGMENT_PATTERN)
+            if text is None:
+                text = _splice_dumps(_json.dumps, value, fallback, **options)
+            fragments.clear()
+        return text
+
+    key = _json.encoder.encode_basestring_ascii if ensure_ascii else _json.encoder.encode_basestring
+    item_separator, key_separator = separators
+    markers = set()
+
+    def newline(level):
+        return "" if indent is None else "\n" + " " * (indent * level)
+
+    def walk(value, level):
+        is_dict = isinstance(value, dict)
+        if not (
+            (is_dict or isinstance(value, (list, tuple)))
+            and value
+            and level < _WALK_DEPTH
+            and (level < 2 or len(value) >= _WALK_MIN)
+            and (not is_dict or all(type(k) is str for k in value))
+        ):
+            text = dumps(value)
+            # json strings never hold a raw newline, re-indenting the nested dump is a plain replace
+            yield text.replace("\n", newline(level)) if indent is not None and level else text
+            return
+
+        if id(value) in markers:
+            raise ValueError("Circular reference detected")
+        markers.add(id(value))
+        inner = newline(level + 1)
+        yield ("{" if is_dict else "[") + inner
+        items = (sorted(value.items()) if sort_keys else value.items()) if is_dict else value
+        for i, item in enumerate(items):
+            if i:
+                yield item_separator + inner
+            if is_dict:
+                yield key(item[0]) + key_separator
+                item = item[1]
+            yield from walk(item, level + 1)
+        yield newline(level) + ("}" if is_dict else "]")
+        markers.discard(id(value))
+
+    buffer, size = [], 0
+    for piece in walk(data, 0):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+            if pause is not None:
+                pause()
+    buffer.append(end)
+    yield "".join(buffer).encode("utf-8")
+
+
+def _green_pause() -> t.Optional[t.Callable[[], t.Any]]:
+    """ gevent/eventlet's sleep when the stdlib is monkeypatched, else None
+
+    Only looks at modules that are already imported, never imports gevent or eventlet itself.
+    """
+    if "gevent.monkey" in sys.modules and sys.modules["gevent.monkey"].is_module_patched("socket"):
+        # sleep(0) may switch straight back without polling sockets, any positive value waits for the next loop
+        return functools.partial(sys.modules["gevent"].sleep, 1e-6)
+    if "eventlet.patcher" in sys.modules and sys.modules["eventlet.patcher"].is_monkey_patched("socket"):
+        return sys.modules["eventlet"].sleep
+    return None
+
+
+def _cooperative(data: t.Any) -> t.Optional[t.Callable[[], t.Any]]:
+    """ JSONIFY_COOPERATIVE: None (default) detects a green worker, True forces it, False turns it off
+
+    Only for data of at least JSONIFY_COOPERATIVE_ITEMS items, smaller responses are over before another
+    greenlet would notice and keep the schema encoder and a Content-Length.
+    """
+    setting = current_app.config.get("JSONIFY_COOPERATIVE")
+    if setting is False or not _is_large(data, int(current_app.config.get("JSONIFY_COOPERATIVE_ITEMS", 1000))):
+        return None
+    pause = _green_pause()
+    if pause is None and setting:
+        return lambda: None  # no hub to yield to, still streamed in chunks
+    return pause
+
+
+def _is_large(data: t.Any, items: int) -> bool:
+    """ At least `items` items in the top two levels, len() of the containers only, at most `items` values looked at """
+    if not isinstance(data, (dict, list, tuple)):
+        return False
+    count = len(data)
+    for value in itertools.islice(data.values() if isinstance(data, dict) else data, items):
+        if count >= items:
+            break
+        if isinstance(value, (dict, list, tuple)):
+            count += len(value)
+    return count >= items
+
+
+_VIEWER_MODES = ("client", "server", "stream")
+_URL_PREFIXES = ("http://", "https://", "ftp://", "ftps://")
+_LOCAL_URL = re.compile(r"^http://(?:localhost|127\.0\.0\.1)")
+
+
+def _viewer_mode() -> str:
+    """ JSONIFY_VIEWER_MODE: "client" (default) builds the tree in the browser, "server" streams it as html,
+    "stream" sends the page alone and the viewer fetches the json and builds the tree while it downloads
+    """
+    mode = current_app.config.get("JSONIFY_VIEWER_MODE") or "client"
+    if mode not in _VIEWER_MODES:
+        raise ValueError(f"JSONIFY_VIEWER_MODE must be one of {', '.join(_VIEWER_MODES)}, not {mode!r}")
+    return mode
+
+
+def _iter_tree(
+    data: t.Any,
+    max_string: int,
+    chunk_size: int = _STREAM_CHUNK,
+    pause: t.Optional[t.Callable[[], t.Any]] = None,
+    numeric_summary: int = 0,
+) -> t.Iterator[bytes]:
+    """ The viewer's tree as html in ~chunk_size byte chunks, the markup json2html() builds in the browser
+
+    JSONIFY_VIEWER_MODE="server": the top of the tree is painted while the rest is still arriving, and the
+    page reads without javascript. The toggles, filter and refresh are delegated and attach to it as is.
+    Walked with a stack rather than recursion so a chunk can be handed out from anywhere in the tree.
+    """
+    sort_keys, _ = _json_options()
+    flush_at = max(chunk_size // 32, 1)  # ~32 bytes a piece
+    out = []
+    stack = []
+
+    def normal(value):
+        if value is None or isinstance(value, (str, int, float, dict, list, tuple)):
+            return value
+        # RawJSON/RawFragment, datetime, Decimal... shown as the json they serialize to
+        return _json.loads(value.data if isinstance(value, RawJSON) else _dumps(value))
+
+    def enter(value, path, tail):
+        """ Append value's html, a container only gets its opening and its items are walked from the stack """
+        if isinstance(value, str):
+            out.append(_tree_string(value, path, max_string))
+        elif value is None:
+            out.append('<span class="json-literal json-null">null</span>')
+        elif value is True or value is False:
+            out.append('<span class="json-literal json-bool">' + ("true" if value else "false") + "</span>")
+        elif isinstance(value, (int, float)):
+            out.append('<span class="json-literal">' + _tree_number(value) + "</span>")
+        elif not value:
+            out.append("{}" if isinstance(value, dict) else "[]")
+        elif 0 < numeric_summary <= len(value) and not isinstance(value, dict) and _is_numeric(value):
+            out.append("[" + _tree_numeric(value, path) + "]")
+        elif isinstance(value, dict):
+            items = sorted(value.items()) if sort_keys else list(value.items())
+            out.append('{<ul class="json-dict">')
+            stack.append([iter(items), len(items), path, True, "</ul>}" + tail])
+            return
+        else:
+            out.append('[<ol class="json-array">')
+            stack.append([enumerate(value), len(value), path, False, "</ol>]" + tail])
+            return
+        out.append(tail)
+
+    data = normal(data)
+    if isinstance(data, (dict, list, tuple)) and data:
+        out.append('<a href class="json-toggle"></a>')
+    enter(data, "", "")
+
+    while stack:
+        frame = stack[-1]
+        item = next(frame[0], None)
+        if item is None:
+            stack.pop()
+            out.append(frame[4])
+        else:
+            key, value = item
+            frame[1] -= 1
+            value = normal(value)
+            if frame[3]:
+                key = key if isinstance(key, str) else _json.dumps(key)
+                path = frame[2] + "/" + key.replace("~", "~0").replace("/", "~1")
+                label = _html.escape(key)
+            else:
+                path = frame[2] + "/" + str(key)
+                label = ""
+            out.append(f'<li data-path="{_html.escape(path)}">')
+            if isinstance(value, (dict, list, tuple)) and value:
+                out.append(f'<a href class="json-toggle">{label}</a>')
+            else:
+                out.append(label)
+            if frame[3]:
+                out.append(": ")
+            enter(value, path, ("</li>" if frame[1] == 0 else ",</li>"))
+
+        if len(out) >= flush_at:
+            yield "".join(out).encode("utf-8")
+            out.clear()
+            if pause is not None:
+                pause()
+
+    if out:
+        yield "".join(out).encode("utf-8")
+
+
+def _tree_string(value: str, path: str, max_string: int) -> str:
+    """ A string as json2html() shows it, long ones as a preview the viewer expands from the data by path """
+    if 0 < max_string < len(value):
+        preview = _html.escape(value[:max_string]).replace("&quot;", "\\&quot;")
+        path = _html.escape(path)
+        return (
+            f'<span class="json-string json-truncated" data-long-path="{path}">"{preview}…"</span>'
+            f'<a href class="json-expand" data-long-path="{path}">{len(value):,} chars</a>'
+        )
+    value = _html.escape(value)
+    if value.startswith(_URL_PREFIXES):
+        url = _LOCAL_URL.sub("", value)
+        return f'<a href="{url}" class="json-string" target="_blank" rel="noreferrer noopener">{url}</a>'
+    return '<span class="json-string">"' + value.replace("&quot;", "\\&quot;") + '"</span>'
+
+
+def _is_numeric(values: t.Sequence[t.Any]) -> bool:
+    return all(type(e) is float or type(e) is int for e in values)
+
+
+def _tree_numeric(values: t.Sequence[t.Union[int, float]], path: str) -> str:
+    """ The viewer's summary of a numeric array, it draws the sparkline and pages the items from the data by path """
+    low, high, mean = (_tree_number(float(f"{e:.6g}")) for e in (min(values), max(values), sum(values) / len(values)))
+    summary = f"{len(values):,} numbers, min {low} max {high} mean {mean}"
+    return (
+        f'<span class="json-numeric" data-numeric-path="{_html.escape(path)}" data-count="{len(values)}">'
+        f'<span class="json-numeric-stats">{summary}</span>'
+        '<canvas class="json-sparkline" width="240" height="24"></canvas>'
+        '<span class="json-numeric-pager"><a href class="json-numeric-page" data-page="0">show items</a></span>'
+        '<ol class="json-array json-numeric-items hidden"></ol></span>'
+    )
+
+
+_SAFE_INTEGER = 2 ** 53 - 1  # Number.MAX_SAFE_INTEGER
+
+
+def _tree_number(value: t.Union[int, float]) -> str:
+    """ As the viewer shows it, javascript's String() of the parsed number: 3 not 3.0, 1e-7 not 1e-07,
+    ints past 2**53 rounded. Infinity/NaN like json.dumps writes them
+    """
+    if isinstance(value, int):
+        if -_SAFE_INTEGER <= value <= _SAFE_INTEGER:
+            return int.__repr__(value)
+        try:
+            value = float(value)
+        except OverflowError:
+            return "Infinity" if value > 0 else "-Infinity"
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value == 0:
+        return "0"  # -0 too
+    text = float.__repr__(value)
+    if "e" not in text:
+        # 1e-4 <= |value| < 1e16, fixed notation in both
+        return text[:-2] if text.endswith(".0") else text
+
+    # Number.prototype.toString: the same shortest digits, fixed notation from 1e-6 up to 1e21
+    mantissa, exponent = text.split("e")
+    sign = "-" if mantissa[0] == "-" else ""
+    digits = mantissa.lstrip("-").replace(".", "")
+    k, n = len(digits), 1 + int(exponent)  # digit count, position of the decimal point
+    if k <= n <= 21:
+        return sign + digits + "0" * (n - k)
+    if 0 < n <= 21:
+        return sign + digits[:n] + "." + digits[n:]
+    if -6 < n <= 0:
+        return sign + "0." + "0" * -n + digits
+    return sign + digits[0] + ("." + digits[1:] if k > 1 else "") + "e" + ("+" if n > 0 else "-") + str(abs(n - 1))
+
+
+_JSON_WHITESPACE = b" \t\r\n"
+_JSON_CLOSERS = {ord("{"): ord("}"), ord("["): ord("]"), ord('"'): ord('"')}
+
+
+def _looks_like_json(data: bytes) -> bool:
+    """ O(1)-ish sanity check, a full parse is what RawJSON is trying to avoid """
+    start, end = 0, len(data)
+    while start < end and data[start] in _JSON_WHITESPACE:
+        start += 1
+    while end > start and data[end - 1] in _JSON_WHITESPACE:
+        end -= 1
+    if start == end:
+        return False
+
+    first, last = data[start], data[end - 1]
+    if first in _JSON_CLOSERS:
+        return end - start > 1 and last == _JSON_CLOSERS[first]
+    # numbers, true, false, null
+    return first in b"-0123456789tfn" and last in b"0123456789el"
+
+
+def _textarea_escape(body: bytes) -> bytes:
+    """ Escape json for the viewer's <textarea>.
+
+    Only '&' and '<' can change the meaning of textarea content,
+    quotes are left alone so the payload doesn't grow on every string value.
+    Works on the encoded bytes, both characters are ascii so this is safe for utf-8,
+    and nothing is copied when neither appears.
+    """
+    if b"&" in body:
+        body = body.replace(b"&", b"&amp;")
+    if b"<" in body:
+        body = body.replace(b"<", b"&lt;")
+    return body
+
+
+_DATA_SLOT = "jsonify-data-slot"
+_TREE_SLOT = "jsonify-tree-slot"
+
+
+@functools.lru_cache(maxsize=64)
+def _viewer_parts(**context: t.Any) -> t.Tuple[bytes, ...]:
+    """ The viewer page rendered once per context and split around the data, as bytes.
+
+    A response is then just [prefix, data, suffix], the template isn't compiled or rendered
+    per request and the json is never copied into a template string.
+    With mode="server" the page is also split around the tree: [prefix, tree, middle, data, suffix].
+    """
+    environment = jinja2.Environment(autoescape=True)
+    html = environment.from_string(JSONIFY_TEMPLATE_STRING).render(data=Markup(_DATA_SLOT), tree=Markup(_TREE_SLOT), **context)
+    head, suffix = html.split(_DATA_SLOT)
+    return tuple(e.encode("utf-8") for e in head.split(_TREE_SLOT)) + (f"\n{suffix}\n".encode("utf-8"),)
 
 
 def jsonify(*args: t.Any, **kwargs: t.Any):
@@ -93,13 +600,6 @@ def jsonify(*args: t.Any, **kwargs: t.Any):
         a security risk in ancient browsers. See :ref:`security-json`.
     .. versionadded:: 0.2
     """
-    indent = None
-    separators = (",", ":")
-
-    if current_app.config["JSONIFY_PRETTYPRINT_REGULAR"] or current_app.debug:
-        indent = 2
-        separators = (", ", ": ")
-
     if args and kwargs:
         raise TypeError("jsonify() behavior undefined when passed both args and kwargs")
     elif len(args) == 1:  # single args are passed directly to dumps()
@@ -107,22 +607,65 @@ def jsonify(*args: t.Any, **kwargs: t.Any):
     else:
         data = args or kwargs
 
+    return _response(data)
+
+
+def _response(data: t.Any):
+    """ Build the html viewer or json response for data.
+
+    Shared by jsonify() and JsonifyProvider.response(), so `return jsonify(...)`,
+    `return {...}` and make_response all take the same path.
+    """
+    started = time.perf_counter()
+    provider = getattr(current_app, "json", None)  # flask >= 2.2
+    compact = getattr(provider, "compact", None)
+    mimetype = current_app.config.get("JSONIFY_MIMETYPE") or getattr(provider, "mimetype", "application/json")
+
+    indent = None
+    separators = (",", ":")
+
+    if current_app.config.get("JSONIFY_PRETTYPRINT_REGULAR") or (compact is None and current_app.debug) or compact is False:
+        indent = 2
+        separators = (", ", ": ")
+
+    select = request.args.get("jsonify_select") if current_app.config.get("JSONIFY_SELECT") else None
+    if select:
+        # only the selected branch is serialized and sent
+        data = _select(data, select)
+
+    is_raw = isinstance(data, RawJSON)
+
     # "##############################"
     # "#   JSONFIY OVERRIDE  START  #"
     # "##############################"
     always_on = current_app.config.get("JSONIFY_ALWAYS") or getenv("JSONIFY_ALWAYS", "").lower() == "1" # pending feature: will run when debug mode is both True and False
-    content_type = request.headers.get("Content-Type") # application/json
-    is_broswer = any(e in request.headers.get('User-Agent', '').lower() for e in {"mozilla", "linux", "apple", "gecko", "chrome", "safari", "firefox", "iphone", "opera", "android"})
-    force_json = request.headers.get("X-jsonify") == "application/json"
-    
+    enabled = bool(always_on or current_app.debug)
+    sniff_ua = current_app.config.get("JSONIFY_UA_SNIFF", True)
+    binary = _binary_mimetype(request.headers.get("Accept", "")) if _BINARY_DUMPS else None
+    if binary:
+        wants_html, decided_by = False, "accept"
+    elif enabled:
+        wants_html, decided_by = _decide(request.headers, sniff_ua)
+    else:
+        wants_html, decided_by = False, "disabled"
+    download = request.args.get("jsonify_download") if enabled else None
+    conditional = not wants_html and request.headers.get("X-jsonify") == "application/json"
+    pause = None if is_raw or binary else _cooperative(data)
+    chunk_size = int(current_app.config.get("JSONIFY_COOPERATIVE_BYTES", 16 * 1024))
+
     if current_app.debug and getenv("JSONIFY_VERBOSE", "").lower() == "1":
       print("JSONIFY DEBUG")
       print("#############")
       print("current_app.debug :", current_app.debug)
       print("always_on :", always_on, type(always_on))
       print("JSONIFY_ALWAYS :", bool(getenv("JSONIFY_ALWAYS")), type(bool(getenv("JSONIFY_ALWAYS"))))
-      print("content_type :", content_type)
-      print("is_broswer :", is_broswer)
+      print("content_type :", request.headers.get("Content-Type"))
+      print("accept :", request.headers.get("Accept"))
+      print("binary :", binary)
+      print("wants_html :", wants_html)
+      print("download :", download)
+      print("select :", select)
+      print("cooperative :", pause is not None)
       print("")
       print("request.headers :", request.headers)
       print("")
@@ -131,28 +674,363 @@ def jsonify(*args: t.Any, **kwargs: t.Any):
       print("")
 
 
-    if content_type != "application/json" and (always_on or current_app.debug) and is_broswer is True:
-        # This will fail in the same way normal jsonify fails - when json.dump can not serialize a object within the dict
-        # print("Returning Jsonify UI")
-        # return render_template("jsonify.html", data=json.dumps(data, indent=indent, separators=separators))
-        html_string = render_template_string(JSONIFY_TEMPLATE_STRING, data=f"{json.dumps(data, indent=indent, separators=separators)}\n")
-        return current_app.response_class(f"{html_string}\n", mimetype="text/html")
+    if download is not None:
+        # the viewer's download button, streamed so big payloads never sit in the page or in server memory whole
+        response = _download_response(data, download != "compact", mimetype)
+        _record("download", "jsonify_download", started, None, response)
+        return response
+
+    if binary:
+        # service to service clients that asked for msgpack/cbor, same extended types as json
+        encoded = time.perf_counter()
+        body = _BINARY_DUMPS[binary](data, _binary_default(_app_default()))
+        serialize = time.perf_counter() - encoded
+        response = current_app.response_class(body, mimetype=binary)
+        kind = "binary"
 
-    # if content_type != "application/json" and (always_on or current_app.debug == False) and is_broswer is True:
+    elif wants_html:
         # This will fail in the same way normal jsonify fails - when json.dump can not serialize a object within the dict
         # print("Returning Jsonify UI")
         # return render_template("jsonify.html", data=json.dumps(data, indent=indent, separators=separators))
-        # return render_template_string(JSONIFY_TEMPLATE_STRING, data=json.dumps(data, indent=indent, separators=separators))
+        # always compact, the viewer re-renders the tree and indents the raw view itself when asked
+        max_string = int(current_app.config.get("JSONIFY_MAX_STRING", 500))
+        numeric_summary = int(current_app.config.get("JSONIFY_NUMERIC_SUMMARY", 1000))
+        mode = _viewer_mode()
+        parts = _viewer_parts(
+            max_string=max_string,
+            numeric_summary=numeric_summary,
+            auto_refresh=float(current_app.config.get("JSONIFY_AUTO_REFRESH", 0)),
+            select=bool(current_app.config.get("JSONIFY_SELECT")),
+            telemetry=_telemetry_url(),
+            mode=mode,
+        )
+        kind, serialize = "html", None
+        if mode == "stream":
+            # no data, the viewer fetches it with X-jsonify and renders as it arrives
+            response = current_app.response_class(list(parts), mimetype="text/html")
+        elif mode == "server":
+            # the tree as html first so the browser paints it as it arrives, the json for raw/copy/refresh after it
+            prefix, middle, suffix = parts
+            tree = _iter_tree(data, max_string, chunk_size, pause, numeric_summary)
+            body = (data.data,) if is_raw else _iter_dumps(data, chunk_size=chunk_size, pause=pause)
+            chunks = itertools.chain((prefix,), tree, (middle,), map(_textarea_escape, body), (suffix,))
+            response = current_app.response_class(stream_with_context(chunks), mimetype="text/html")
+        elif pause is not None:
+            # green worker, serialize a chunk at a time and let the other greenlets run in between
+            prefix, suffix = parts
+            body = (_textarea_escape(chunk) for chunk in _iter_dumps(data, chunk_size=chunk_size, pause=pause))
+            response = current_app.response_class(stream_with_context(itertools.chain((prefix,), body, (suffix,))), mimetype="text/html")
+        else:
+            prefix, suffix = parts
+            encoded = time.perf_counter()
+            body = data.data if is_raw else _encode(data).encode("utf-8")
+            serialize = None if is_raw else time.perf_counter() - encoded
+            # a list body, werkzeug sends the chunks as is and works out the Content-Length
+            response = current_app.response_class([prefix, _textarea_escape(body), suffix], mimetype="text/html")
 
     # print("Returning Normal JSON")
     # "##############################"
     # "#   JSONFIY OVERRIDE  END    #"
     # "##############################"
 
-    return current_app.response_class(
-        f"{json.dumps(data, indent=indent, separators=separators)}\n",
-        mimetype=current_app.config["JSONIFY_MIMETYPE"],
-    )
+    elif is_raw:
+        # already json, no dumps and no copy
+        response = current_app.response_class(data.data, mimetype=mimetype)
+        kind, serialize = "raw", None
+
+    elif pause is not None:
+        chunks = _iter_dumps(data, indent, separators, chunk_size, pause, end="\n")
+        # the ETag needs the whole body, still serialized cooperatively
+        body = list(chunks) if conditional else stream_with_context(chunks)
+        response = current_app.response_class(body, mimetype=mimetype)
+        kind, serialize = "json", None
+
+    else:
+        # encoded once, the str is released straight after and the newline isn't worth copying the body for
+        encoded = time.perf_counter()
+        body = _encode(data, indent, separators).encode("utf-8")
+        serialize = time.perf_counter() - encoded
+        response = current_app.response_class([body, b"\n"], mimetype=mimetype)
+        kind = "json"
+
+    if conditional:
+        # The viewer's refresh button asks for json with X-jsonify, give it a 304 when nothing changed
+        _make_conditional(response)
+
+    if enabled:
+        # Same url, two representations - shared caches must key on whatever made the decision
+        response.vary.update(_VARY_UA if sniff_ua else _VARY)
+    elif _BINARY_DUMPS:
+        response.vary.add("Accept")
+
+    _record(kind, decided_by, started, serialize, response)
+    return response
+
+
+def _record(kind: str, decided_by: str, started: float, serialize: t.Optional[float], response):
+    """ Count the response for JsonifyMetrics, bodies are only measured when they're already in memory """
+    metrics = current_app.extensions.get("jsonify_metrics")
+    if metrics is None:
+        return
+    size = sum(map(len, response.response)) if isinstance(response.response, list) else None
+    metrics.record(kind, decided_by, time.perf_counter() - started, serialize, size)
+
+
+def _telemetry_url() -> str:
+    """ Where the viewer sends its render timings, empty unless JsonifyTelemetry is installed """
+    telemetry = current_app.extensions.get("jsonify_telemetry")
+    return request.script_root + telemetry.url if telemetry is not None else ""
+
+
+def _download_response(data: t.Any, pretty: bool, mimetype: str):
+    """ ?jsonify_download=pretty|compact, the data as a streamed attachment named after the url """
+    name = _download_name(request.path)
+
+    if isinstance(data, RawJSON):
+        # indenting would mean parsing it, raw json is sent as it came
+        response = current_app.response_class(data.data, mimetype=mimetype)
+    else:
+        indent, separators = (2, (", ", ": ")) if pretty else (None, (",", ":"))
+        body = _iter_dumps(data, indent, separators, end="\n")
+        response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers.set("Content-Disposition", "attachment", filename=name)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+_SELECT_MAX_LENGTH = 1024
+_SELECT_MAX_FIELDS = 64
+_SELECT_MAX_DEPTH = 32
+
+
+def _select(data: t.Any, select: str) -> t.Any:
+    """ ?jsonify_select=, a JSON Pointer (/items/0/name) or a field list (id,name,owner.email)
+
+    A pointer returns the value it points at. A field list keeps those keys, dotted names reach into
+    nested objects and lists are projected item by item. 400 on bad input, 404 when a pointer misses.
+    """
+    if len(select) > _SELECT_MAX_LENGTH:
+        abort(400, f"jsonify_select is longer than {_SELECT_MAX_LENGTH} characters")
+
+    if select.startswith("/"):
+        tokens = [e.replace("~1", "/").replace("~0", "~") for e in select[1:].split("/")]
+        if len(tokens) > _SELECT_MAX_DEPTH:
+            abort(400, f"jsonify_select is deeper than {_SELECT_MAX_DEPTH}")
+        value = data
+        for token in tokens:
+            value = _selectable(value)
+            if isinstance(value, dict) and token in value:
+                value = value[token]
+            elif isinstance(value, (list, tuple)) and token.isdigit() and (token == "0" or token[0] != "0") and int(token) < len(value):
+                value = value[int(token)]
+            else:
+                abort(404, f"jsonify_select {select!r} does not match the data")
+        return value
+
+    fields = [e.strip() for e in select.split(",") if e.strip()]
+    if len(fields) > _SELECT_MAX_FIELDS:
+        abort(400, f"jsonify_select has more than {_SELECT_MAX_FIELDS} fields")
+    tree = {}
+    for field in fields:
+        names = field.split(".")
+        if len(names) > _SELECT_MAX_DEPTH or not all(names):
+            abort(400, f"jsonify_select field {field!r} is not valid")
+        node = tree
+        for name in names:
+            node = node.setdefault(name, {})
+    return _project(data, tree, 0)
+
+
+def _project(value: t.Any, tree: dict, level: int) -> t.Any:
+    if level > _SELECT_MAX_DEPTH:
+        abort(400, f"jsonify_select goes deeper than {_SELECT_MAX_DEPTH}")
+    value = _selectable(value)
+    if isinstance(value, (list, tuple)):
+        return [_project(e, tree, level + 1) for e in value]
+    if isinstance(value, dict):
+        return {k: _project(value[k], sub, level + 1) if sub else value[k] for k, sub in tree.items() if k in value}
+    return value
+
+
+def _selectable(value: t.Any) -> t.Any:
+    """ Pre-serialized json is parsed and objects go through the app's default (dataclasses etc) so they can be walked """
+    if isinstance(value, RawJSON):
+        return json.loads(value.data)
+    if value is None or isinstance(value, (dict, list, tuple, str, int, float, bool)):
+        return value
+    try:
+        return _app_default()(value)
+    except TypeError:
+        return value
+
+
+def _download_name(path: str) -> str:
+    """ The attachment's file name, the last segment of the url path made safe, .json unless it has it already """
+    name = secure_filename(path.rstrip("/").rsplit("/", 1)[-1]) or "data"
+    return name if name.endswith(".json") else name + ".json"
+
+
+def _make_conditional(response):
+    """ ETag from the body chunks, hashed in place rather than joined, then answer If-None-Match """
+    digest = hashlib.sha1()
+    for chunk in response.response:
+        digest.update(chunk)
+    response.set_etag(digest.hexdigest())
+    response.make_conditional(request)
+
+
+_BROWSER_HINTS = ("mozilla", "linux", "apple", "gecko", "chrome", "safari", "firefox", "iphone", "opera", "android")
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+_VARY = ("Accept", "Content-Type", "X-jsonify")
+_VARY_UA = _VARY + ("User-Agent",)
+
+
+def _wants_html(headers: t.Mapping[str, str], sniff_ua: bool = True) -> bool:
+    """ Should this request get the html viewer rather than json
+
+    - `Content-Type: application/json` or `X-jsonify: application/json` always get json
+    - `Accept` decides when it prefers one of html/json over the other (q-values respected), refuses html
+      (`text/html;q=0`) or names only one of them on a tie (`application/json, */*` is an API client)
+    - otherwise fall back to guessing from the User-Agent, unless sniff_ua is off
+    """
+    return _decide(headers, sniff_ua)[0]
+
+
+def _decide(headers: t.Mapping[str, str], sniff_ua: bool = True) -> t.Tuple[bool, str]:
+    """ _wants_html() and the header that decided it, for JsonifyMetrics """
+    if _mimetype(headers.get("Content-Type", "")) == "application/json":
+        return False, "content-type"
+    if headers.get("X-jsonify") == "application/json":
+        return False, "x-jsonify"
+
+    accept = headers.get("Accept")
+    if accept:
+        (html_q, html_specificity), (json_q, json_specificity) = _accept_quality(accept)
+        if html_specificity == 2 and html_q == 0:
+            return False, "accept"  # html named and refused
+        if html_q != json_q:
+            return html_q > json_q, "accept"
+        if json_specificity == 2:
+            return False, "accept"  # json named, html only through a wildcard or also named
+        if html_specificity == 2:
+            return True, "accept"
+
+    if not sniff_ua:
+        return False, "default"
+    return _is_browser(headers.get("User-Agent", "")), "user-agent"
+
+
+def _mimetype(value: str) -> str:
+    return value.partition(";")[0].strip().lower()
+
+
+@functools.lru_cache(maxsize=512)
+def _is_browser(user_agent: str) -> bool:
+    """ Anything remotely browser in the string, there are only so many distinct user agents so cache it """
+    user_agent = user_agent.lower()
+    return any(e in user_agent for e in _BROWSER_HINTS)
+
+
+@functools.lru_cache(maxsize=512)
+def _accept_ranges(accept: str) -> t.Tuple[t.Tuple[str, float], ...]:
+    """ (media range, q) pairs from an Accept header, browsers send the same handful so the parse is cached """
+    ranges = []
+    for item in accept.split(","):
+        media_range, *params = item.split(";")
+        media_range = media_range.strip().lower()
+        if "/" not in media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        ranges.append((media_range, q))
+    return tuple(ranges)
+
+
+def _quality(ranges: t.Iterable[t.Tuple[str, float]], mimetype: str, exact: bool = False) -> t.Tuple[float, int]:
+    """ (q, specificity) of the most specific matching media range, ie `text/html` (2) beats `text/*` (1) beats `*/*` (0)
+
+    Specificity is -1 when nothing matches.
+    """
+    main_type = mimetype.split("/")[0]
+    best, best_specificity = 0.0, -1
+    for media_range, q in ranges:
+        if media_range == mimetype:
+            specificity = 2
+        elif exact:
+            continue
+        elif media_range == f"{main_type}/*":
+            specificity = 1
+        elif media_range == "*/*":
+            specificity = 0
+        else:
+            continue
+        if specificity > best_specificity:
+            best, best_specificity = q, specificity
+    return best, best_specificity
+
+
+@functools.lru_cache(maxsize=512)
+def _accept_quality(accept: str) -> t.Tuple[t.Tuple[float, int], t.Tuple[float, int]]:
+    """ (q, specificity) for html and json in an Accept header
+
+    Of the html types the most specifically named one counts, so `text/html;q=0, */*` refuses html
+    even though `application/xhtml+xml` matches the wildcard.
+    """
+    ranges = _accept_ranges(accept)
+    html = max((_quality(ranges, e) for e in _HTML_TYPES), key=lambda e: (e[1], e[0]))
+    return html, _quality(ranges, "application/json")
+
+
+@functools.lru_cache(maxsize=512)
+def _binary_mimetype(accept: str) -> t.Optional[str]:
+    """ msgpack/cbor when the client names one explicitly (not via */*) and likes it at least as much as json/html """
+    ranges = _accept_ranges(accept)
+    best, best_q = None, 0.0
+    for mimetype in _BINARY_DUMPS:
+        q, _ = _quality(ranges, mimetype, exact=True)
+        if q > best_q:
+            best, best_q = mimetype, q
+    (html_q, _), (json_q, _) = _accept_quality(accept)
+    if best is None or best_q < max(html_q, json_q):
+        return None
+    return best
+
+
+# Types the binary formats would otherwise encode natively, sent through the app's json `default`
+# instead so a Decimal, datetime or UUID comes out the same in every format
+_EXTENDED_TYPES = (decimal.Decimal, uuid.UUID, datetime.date, datetime.datetime)
+
+
+def _binary_default(fallback: t.Callable[[t.Any], t.Any]) -> t.Callable[[t.Any], t.Any]:
+    def default(o):
+        if isinstance(o, RawJSON):
+            return json.loads(o.data)  # no way around a parse, the bytes are json
+        return fallback(o)
+    return default
+
+
+def _msgpack_dumps(data: t.Any, default: t.Callable[[t.Any], t.Any]) -> bytes:
+    return msgpack.packb(data, default=default, use_bin_type=True)
+
+
+def _cbor_dumps(data: t.Any, default: t.Callable[[t.Any], t.Any]) -> bytes:
+    def convert(encoder, value):
+        encoder.encode(default(value))
+    return cbor2.dumps(data, default=convert, encoders={e: convert for e in _EXTENDED_TYPES})
+
+
+_BINARY_DUMPS: t.Dict[str, t.Callable[[t.Any, t.Callable[[t.Any], t.Any]], bytes]] = {}
+if msgpack is not None:
+    _BINARY_DUMPS["application/msgpack"] = _msgpack_dumps
+    _BINARY_DUMPS["application/x-msgpack"] = _msgpack_dumps
+if cbor2 is not None:
+    _BINARY_DUMPS["application/cbor"] = _cbor_dumps
 
 
 JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
@@ -459,6 +1337,122 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
           display: none !important;
       }
 
+      /* Filter, only matching branches are shown */
+      .json-filtering li:not(.json-match) {
+          display: none;
+      }
+
+      .json-filtering li.json-hit li {
+          display: list-item;
+      }
+
+      .json-filtering li.json-match > ul.json-dict.collapsed,
+      .json-filtering li.json-match > ol.json-array.collapsed,
+      .json-filtering > ul.json-dict.collapsed,
+      .json-filtering > ol.json-array.collapsed {
+          display: block;
+      }
+
+      a.json-expand {
+          color: #aaa;
+          font-size: 85%;
+          margin-left: 0.5em;
+          text-decoration: none;
+          cursor: pointer;
+      }
+
+      a.json-expand:hover {
+          text-decoration: underline;
+      }
+
+      span.json-numeric.collapsed {
+          display: none;
+      }
+
+      .json-filtering li.json-match > span.json-numeric.collapsed {
+          display: inline;
+      }
+
+      .json-numeric-stats,
+      .json-numeric-pager {
+          color: #aaa;
+      }
+
+      canvas.json-sparkline {
+          width: 240px;
+          height: 24px;
+          margin: 0 0.5em;
+          vertical-align: middle;
+      }
+
+      a.json-numeric-page {
+          color: #aaa;
+          margin: 0 0.25em;
+          text-decoration: none;
+          cursor: pointer;
+      }
+
+      a.json-numeric-page:hover {
+          text-decoration: underline;
+      }
+
+      a.json-lazy {
+          color: #aaa;
+          text-decoration: none;
+          cursor: pointer;
+      }
+
+      a.json-lazy:hover {
+          text-decoration: underline;
+      }
+
+      @keyframes json-changed {
+          from { background: rgba(255, 215, 0, 0.35); }
+          to { background: transparent; }
+      }
+
+      li.json-changed {
+          animation: json-changed 1.5s ease-out;
+      }
+
+      #autoRefresh {
+          background: #1c2833;
+          color: #fff;
+          border: 1px solid #525252;
+      }
+
+      .json-filtering li.json-hit {
+          background: rgba(255, 255, 255, 0.06);
+      }
+
+      #jsonFilter {
+          background: #1c2833;
+          color: #fff;
+          border: 1px solid #525252;
+          font-family: Menlo, Monaco, Consolas, "Courier New", monospace;
+      }
+
+      #jsonSelect {
+          color: #aaa;
+          font-size: 80%;
+          margin: 0 0.5em;
+      }
+
+      #jsonSelect code {
+          color: #fff;
+      }
+
+      #jsonSelect a {
+          color: #ff4b60;
+          text-decoration: none;
+      }
+
+      #jsonFilterCount {
+          color: #aaa;
+          font-size: 80%;
+          margin: 0 0.5em;
+      }
+
       .json-bool {
           color: #ff4b60
       }
@@ -554,6 +1548,9 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
            * reference: https://github.com/abodelot/jquery.json-viewer
            */
           function htmlEscape(s) {
+              if (!/[&<>'"]/.test(s)) {
+                  return s;
+              }
               return s.replace(/&/g, '&amp;')
                   .replace(/</g, '&lt;')
                   .replace(/>/g, '&gt;')
@@ -570,14 +1567,48 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
               referenceNode.parentNode.insertBefore(newNode, referenceNode.nextSibling);
           }
 
+          /**
+           * Append a key to a JSON Pointer (RFC 6901), every <li> carries its pointer in data-path
+           * @return string
+           */
+          function pathJoin(path, key) {
+              if (typeof key === 'number') {
+                  return path + '/' + key;
+              }
+              return path + '/' + String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+          }
+
+          /**
+           * A placeholder from `python -m jsonify` for a subtree that is fetched when expanded
+           * @return boolean
+           */
+          function isLazy(arg) {
+              return arg !== null && typeof arg === 'object' && Object.prototype.hasOwnProperty.call(arg, '$jsonify_lazy');
+          }
+
+          function formatBytes(n) {
+              let units = ['B', 'KiB', 'MiB', 'GiB', 'TiB'], i = 0;
+              for (; n >= 1024 && i < units.length - 1; i++) {
+                  n /= 1024;
+              }
+              return (i ? n.toFixed(1) : n) + ' ' + units[i];
+          }
+
           /**
            * Transform a json object into html representation
            * @return string
            * reference: https://github.com/abodelot/jquery.json-viewer
            */
-          function json2html(json, options) {
+          function json2html(json, options, path) {
               var html = '';
-              if (typeof json === 'string') {
+              path = path || '';
+              if (typeof json === 'string' && options.maxString > 0 && json.length > options.maxString) {
+                  // Long strings only get a preview in the DOM, the full text is inserted on expand
+                  var id = longStrings.push(json) - 1;
+                  var preview = htmlEscape(json.slice(0, options.maxString)).replace(/&quot;/g, '\\&quot;');
+                  html += '<span class="json-string json-truncated" data-long="' + id + '">"' + preview + '\u2026"</span>';
+                  html += '<a href class="json-expand" data-long="' + id + '">' + json.length.toLocaleString() + ' chars</a>';
+              } else if (typeof json === 'string') {
                   // Escape tags and quotes
                   json = htmlEscape(json);
 
@@ -598,25 +1629,26 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
               } else if (json === null) {
                   html += '<span class="json-literal json-null">null</span>';
               } else if (json instanceof Array) {
-                  if (json.length > 0) {
+                  if (options.numericSummary > 0 && json.length >= options.numericSummary && isNumeric(json)) {
+                      // long runs of numbers get a summary and a sparkline, the items are paged in on demand
+                      let values = Float64Array.from(json);
+                      html += '[' + numericHtml('data-numeric="' + (numericArrays.push(values) - 1) + '"', values) + ']';
+                  } else if (json.length > 0) {
                       html += '[<ol class="json-array">';
                       for (var i = 0; i < json.length; ++i) {
-                          html += '<li>';
-                          // Add toggle button if item is collapsable
-                          if (isCollapsable(json[i])) {
-                              html += '<a href class="json-toggle"></a>';
-                          }
-                          html += json2html(json[i], options);
-                          // Add comma if item is not last
-                          if (i < json.length - 1) {
-                              html += ',';
-                          }
+                          var itemPath = pathJoin(path, i);
+                          html += '<li data-path="' + htmlEscape(itemPath) + '">';
+                          html += itemHtml(null, json[i], itemPath, i === json.length - 1, options);
                           html += '</li>';
                       }
                       html += '</ol>]';
                   } else {
                       html += '[]';
                   }
+              } else if (options.lazy && isLazy(json)) {
+                  let lazy = json['$jsonify_lazy'];
+                  let label = lazy.more ? '\u2026 more' : (lazy.type === 'array' ? '[\u2026] ' : '{\u2026} ') + formatBytes(lazy.bytes);
+                  html += '<a href class="json-lazy" data-lazy="' + htmlEscape(JSON.stringify(lazy)) + '">' + label + '</a>';
               } else if (typeof json === 'object') {
                   // Optional support different libraries for big numbers
                   // json.isLosslessNumber: package lossless-json
@@ -629,22 +1661,9 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
                           html += '{<ul class="json-dict">';
                           for (var key in json) {
                               if (Object.prototype.hasOwnProperty.call(json, key)) {
-                                  key = htmlEscape(key);
-                                  var keyRepr = options.withQuotes ?
-                                      '<span class="json-string">"' + key + '"</span>' : key;
-
-                                  html += '<li>';
-                                  // Add toggle button if item is collapsable
-                                  if (isCollapsable(json[key])) {
-                                      html += '<a href class="json-toggle">' + keyRepr + '</a>';
-                                  } else {
-                                      html += keyRepr;
-                                  }
-                                  html += ': ' + json2html(json[key], options);
-                                  // Add comma if item is not last
-                                  if (--keyCount > 0) {
-                                      html += ',';
-                                  }
+                                  var keyPath = pathJoin(path, key);
+                                  html += '<li data-path="' + htmlEscape(keyPath) + '">';
+                                  html += itemHtml(key, json[key], keyPath, --keyCount === 0, options);
                                   html += '</li>';
                               }
                           }
@@ -658,64 +1677,854 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
           }
 
           /**
-           * @param json: a javascript object
-           * @param options: an optional options hash
+           * The inside of one <li>: toggle, key, value and the trailing comma
+           * key is null for array items
+           * @return string
            */
-          jsonViewer = function(json, options) {
-              // Merge user options with default options
-              options = Object.assign({}, {
-                  collapsed: false,
-                  rootCollapsable: true,
-                  withQuotes: false,
-                  withLinks: true,
-                  bigNumbers: false
-              }, options);
-
-              // Transform to HTML
-              let html = json2html(json, options);
-              if (options.rootCollapsable && isCollapsable(json)) {
-                  html = '<a href class="json-toggle"></a>' + html;
+          function itemHtml(key, value, path, isLast, options) {
+              var html = '';
+              var keyRepr = key !== null ? keyHtml(key, options) : '';
+              // Add toggle button if item is collapsable
+              if (isCollapsable(value) && !(options.lazy && isLazy(value))) {
+                  html += '<a href class="json-toggle">' + keyRepr + '</a>';
+              } else {
+                  html += keyRepr;
               }
+              if (key !== null) {
+                  html += ': ';
+              }
+              html += json2html(value, options, path);
+              // Add comma if item is not last
+              if (!isLast) {
+                  html += ',';
+              }
+              return html;
+          }
 
-              // Add html json display
-              let element = document.querySelector("pre#json-renderer")
-              element.innerHTML = html
-              element.classList.add('json-document')
-
-              // Bind click on toggle buttons
-              Array.from(element.querySelectorAll('a.json-toggle')).map(e => {
-                  e.addEventListener('click', function(event) {
-                      event.preventDefault();
+          function keyHtml(key, options) {
+              var keyRepr = htmlEscape(key);
+              if (options.withQuotes) {
+                  keyRepr = '<span class="json-string">"' + keyRepr + '"</span>';
+              }
+              return keyRepr;
+          }
 
-                      // Array.from(e.parentElement.querySelectorAll('ul.json-dict')).map( (ee) => {ee.classList.toggle('collapsed')})
-                      // Array.from(e.parentElement.querySelectorAll('ol.json-array')).map( (ee) => {ee.classList.toggle('collapsed')})
+          // Toggle buttons, delegated so nodes patched in by a refresh work too
+          document.addEventListener('click', function(event) {
+              let e = event.target.closest && event.target.closest('a.json-toggle');
+              if (!e) {
+                  return;
+              }
+              event.preventDefault();
+
+              let target = e.nextElementSibling
+              target.classList.toggle('collapsed')
+              e.classList.toggle('collapsed')
+
+              if (!target.classList.contains('collapsed')) {
+                  // Remove placeholder
+                  target.nextElementSibling.remove();
+              } else {
+                  // Add Placeholder
+                  let a_tag = document.createElement('a')
+                  a_tag.innerText = placeholderText(target)
+                  a_tag.setAttribute('class', 'json-placeholder')
+                  a_tag.setAttribute('onclick', 'this.previousElementSibling.previousElementSibling.click()')
+
+                  insertAfter(target, a_tag)
+              }
+          });
 
-                      let target = e.nextElementSibling
-                      target.classList.toggle('collapsed')
-                      e.classList.toggle('collapsed')
+          function placeholderText(target) {
+              let count = target.dataset.count ? Number(target.dataset.count) : target.children.length;
+              return count + (count > 1 ? ' items' : ' item');
+          }
 
-                      target.style.display
+          // Lazy placeholders, the subtree (or the rest of a long container) is fetched and rendered in place
+          document.addEventListener('click', async function(event) {
+              let a = event.target.closest && event.target.closest('a.json-lazy');
+              if (!a) {
+                  return;
+              }
+              event.preventDefault();
+              let li = a.closest('li');
+              if (!li || a.dataset.loading) {
+                  return;
+              }
+              a.dataset.loading = '1';
+              let lazy = JSON.parse(a.dataset.lazy);
+              let params = new URLSearchParams({start: lazy.start, end: lazy.end, type: lazy.type, more: lazy.more ? 1 : 0, index: lazy.index || 0});
+              try {
+                  let response = await fetch('/subtree?' + params, {credentials: 'same-origin'});
+                  if (!response.ok) {
+                      throw new Error(response.status + ' ' + response.statusText);
+                  }
+                  let value = await response.json();
+                  let options = jsonViewer.options;
+                  let path = li.dataset.path;
+                  let parentPath = path.slice(0, path.lastIndexOf('/'));
+                  if (lazy.more) {
+                      // the rest of the parent, new siblings in place of the "more" item (always the last one)
+                      let isArray = Array.isArray(value);
+                      let keys = isArray ? value.map((e, i) => lazy.index + i) : Object.keys(value);
+                      li.insertAdjacentHTML('beforebegin', keys.map((key, i) => {
+                          let itemPath = pathJoin(parentPath, key);
+                          let item = isArray ? value[i] : value[key];
+                          return '<li data-path="' + htmlEscape(itemPath) + '">' + itemHtml(isArray ? null : key, item, itemPath, i === keys.length - 1, options) + '</li>';
+                      }).join(''));
+                      li.remove();
+                  } else {
+                      let key = li.parentElement.classList.contains('json-dict')
+                          ? path.slice(path.lastIndexOf('/') + 1).replace(/~1/g, '/').replace(/~0/g, '~')
+                          : null;
+                      li.innerHTML = itemHtml(key, value, path, !li.nextElementSibling, options);
+                  }
+                  drawSparklines();
+              } catch (error) {
+                  delete a.dataset.loading;
+                  console.log("jsonify lazy load failed: " + error);
+              }
+          });
 
-                      if (!target.classList.contains('collapsed')) {
-                          // Remove placeholder
-                          target.nextElementSibling.remove();
-                      } else {
-                          // Add Placeholder
-                          let count = target.children.length;
-                          let placeholder = count + (count > 1 ? ' items' : ' item');
+          var longStrings = [];
 
-                          a_tag = document.createElement('a')
-                          a_tag.innerText = placeholder
-                          a_tag.setAttribute('class', 'json-placeholder')
-                          a_tag.setAttribute('onclick', 'this.previousElementSibling.previousElementSibling.click()')
+          function stringRepr(s) {
+              return '"' + s.replace(/"/g, '\\"') + '"';
+          }
 
-                          insertAfter(target, a_tag)
-                      }
+          /**
+           * The value at a JSON Pointer in data
+           */
+          function pointerGet(data, path) {
+              return path.split('/').slice(1).reduce((value, key) => value[key.replace(/~1/g, '/').replace(/~0/g, '~')], data);
+          }
+
+          /**
+           * The full text of a truncated string, server rendered trees point at it in the data by path
+           * @return string
+           */
+          function fullString(e) {
+              return 'longPath' in e.dataset ? pointerGet(jsonViewer.data, e.dataset.longPath) : longStrings[e.dataset.long];
+          }
+
+          var numericArrays = [];
+          var sparklines = false;  // summaries rendered since the sparklines were last drawn
+          const NUMERIC_PAGE = 100;
+
+          function isNumeric(array) {
+              for (let i = 0; i < array.length; i++) {
+                  if (typeof array[i] !== 'number') {
                       return false;
+                  }
+              }
+              return true;
+          }
 
-                  })
+          function formatNumber(n) {
+              return String(Number(n.toPrecision(6)));
+          }
+
+          /**
+           * A numeric array as its length, min/max/mean, a sparkline and a pager, the DOM stays the same size however long it is
+           * @return string
+           */
+          function numericHtml(attribute, values) {
+              let min = Infinity, max = -Infinity, sum = 0;
+              for (let i = 0; i < values.length; i++) {
+                  let v = values[i];
+                  min = v < min ? v : min;
+                  max = v > max ? v : max;
+                  sum += v;
+              }
+              sparklines = true;
+              return '<span class="json-numeric" ' + attribute + ' data-count="' + values.length + '">'
+                  + '<span class="json-numeric-stats">' + values.length.toLocaleString() + ' numbers, min ' + formatNumber(min)
+                  + ' max ' + formatNumber(max) + ' mean ' + formatNumber(sum / values.length) + '</span>'
+                  + '<canvas class="json-sparkline" width="240" height="24"></canvas>'
+                  + '<span class="json-numeric-pager"><a href class="json-numeric-page" data-page="0">show items</a></span>'
+                  + '<ol class="json-array json-numeric-items hidden"></ol></span>';
+          }
+
+          /**
+           * The values behind a summary as a Float64Array, server rendered ones point at the data by path
+           */
+          function numericValues(span) {
+              if (!span.numericValues) {
+                  span.numericValues = 'numericPath' in span.dataset
+                      ? Float64Array.from(pointerGet(jsonViewer.data, span.dataset.numericPath))
+                      : numericArrays[span.dataset.numeric];
+              }
+              return span.numericValues;
+          }
+
+          /**
+           * Draw the sparklines of summaries rendered since the last call, per pixel column the min to max of its values
+           */
+          function drawSparklines() {
+              if (!sparklines) {
+                  return;
+              }
+              sparklines = false;
+              document.querySelectorAll('canvas.json-sparkline:not([data-drawn])').forEach(canvas => {
+                  let span = canvas.parentElement;
+                  if ('numericPath' in span.dataset && jsonViewer.data === undefined) {
+                      sparklines = true;  // server rendered, drawn once the data has been adopted
+                      return;
+                  }
+                  let values = numericValues(span);
+                  let ratio = window.devicePixelRatio || 1;
+                  let w = canvas.width = Math.round(240 * ratio);
+                  let h = canvas.height = Math.round(24 * ratio);
+                  let min = Infinity, max = -Infinity;
+                  for (let i = 0; i < values.length; i++) {
+                      min = values[i] < min ? values[i] : min;
+                      max = values[i] > max ? values[i] : max;
+                  }
+                  let scale = max > min ? (h - 2 * ratio) / (max - min) : 0;
+                  let y = v => scale ? h - ratio - (v - min) * scale : h / 2;
+                  let context = canvas.getContext('2d');
+                  context.strokeStyle = '#ae9ced';
+                  context.lineWidth = ratio;
+                  context.beginPath();
+                  if (values.length <= w) {
+                      let step = values.length > 1 ? (w - 1) / (values.length - 1) : 0;
+                      for (let i = 0; i < values.length; i++) {
+                          context[i ? 'lineTo' : 'moveTo'](i * step + 0.5, y(values[i]));
+                      }
+                  } else {
+                      for (let x = 0; x < w; x++) {
+                          let lo = Infinity, hi = -Infinity;
+                          for (let i = Math.floor(x * values.length / w), end = Math.floor((x + 1) * values.length / w); i < end; i++) {
+                              lo = values[i] < lo ? values[i] : lo;
+                              hi = values[i] > hi ? values[i] : hi;
+                          }
+                          context.moveTo(x + 0.5, y(lo) + ratio / 2);
+                          context.lineTo(x + 0.5, y(hi) - ratio / 2);
+                      }
+                  }
+                  context.stroke();
+                  canvas.dataset.drawn = '1';
+              });
+          }
+
+          // Numeric summaries, a page of the items on demand
+          document.addEventListener('click', function(event) {
+              let a = event.target.closest && event.target.closest('a.json-numeric-page');
+              if (!a) {
+                  return;
+              }
+              event.preventDefault();
+              let span = a.closest('span.json-numeric');
+              let values = numericValues(span);
+              let list = span.querySelector(':scope > ol.json-numeric-items');
+              let pager = span.querySelector(':scope > span.json-numeric-pager');
+              let page = Number(a.dataset.page);
+              if (page < 0) {
+                  list.innerHTML = '';
+                  list.classList.add('hidden');
+                  pager.innerHTML = '<a href class="json-numeric-page" data-page="0">show items</a>';
+                  return;
+              }
+              let li = span.closest('li');
+              let path = li ? li.dataset.path : '';
+              let start = page * NUMERIC_PAGE, end = Math.min(start + NUMERIC_PAGE, values.length);
+              let html = '';
+              for (let i = start; i < end; i++) {
+                  let itemPath = pathJoin(path, i);
+                  html += '<li data-path="' + htmlEscape(itemPath) + '">' + itemHtml(null, values[i], itemPath, i === values.length - 1, jsonViewer.options) + '</li>';
+              }
+              list.start = start + 1;
+              list.innerHTML = html;
+              list.classList.remove('hidden');
+              let link = (to, text) => '<a href class="json-numeric-page" data-page="' + to + '">' + text + '</a>';
+              pager.innerHTML = (page > 0 ? link(page - 1, '\u2039') : '') + ' ' + (start + 1).toLocaleString() + '\u2013' + end.toLocaleString()
+                  + ' of ' + values.length.toLocaleString() + ' ' + (end < values.length ? link(page + 1, '\u203a') : '') + link(-1, 'hide');
+          });
+
+          // Expand/shorten a truncated string
+          document.addEventListener('click', function(event) {
+              let badge = event.target.closest && event.target.closest('a.json-expand');
+              if (!badge) {
+                  return;
+              }
+              event.preventDefault();
+              let span = badge.previousElementSibling;
+              let full = fullString(badge);
+              if (span.classList.toggle('json-truncated')) {
+                  span.textContent = stringRepr(full.slice(0, jsonViewer.maxString)).slice(0, -1) + '\u2026"';
+                  badge.innerText = full.length.toLocaleString() + ' chars';
+              } else {
+                  span.textContent = stringRepr(full);
+                  badge.innerText = 'less';
+              }
+          });
+
+          // Copying a selection gives the full value of truncated strings, not the preview
+          document.addEventListener('copy', function(event) {
+              let selection = document.getSelection();
+              if (!selection.rangeCount) {
+                  return;
+              }
+              let fragment = selection.getRangeAt(0).cloneContents();
+              let truncated = fragment.querySelectorAll('.json-truncated');
+              let numeric = fragment.querySelectorAll('span.json-numeric');
+              if (!truncated.length && !numeric.length && !fragment.querySelector('a.json-expand')) {
+                  return;
+              }
+              truncated.forEach(e => e.textContent = stringRepr(fullString(e)));
+              numeric.forEach(e => e.textContent = JSON.stringify(Array.from(numericValues(e))));
+              fragment.querySelectorAll('a.json-expand').forEach(e => e.remove());
+              event.clipboardData.setData('text/plain', fragment.textContent);
+              event.preventDefault();
+          });
+
+          /**
+           * @param json: a javascript object
+           * @param options: an optional options hash
+           */
+          jsonViewer = function(json, options) {
+              options = withDefaults(options);
+              longStrings = [];
+              numericArrays = [];
+
+              // Transform to HTML
+              let html = json2html(json, options);
+              if (options.rootCollapsable && isCollapsable(json)) {
+                  html = '<a href class="json-toggle"></a>' + html;
+              }
+
+              // Add html json display
+              let element = document.querySelector("pre#json-renderer")
+              element.innerHTML = html
+              element.classList.add('json-document')
+
+              jsonViewer.data = json;
+              jsonViewer.options = options;
+              drawSparklines();
+          };
+
+          function withDefaults(options) {
+              // Merge user options with default options
+              options = Object.assign({}, {
+                  collapsed: false,
+                  rootCollapsable: true,
+                  withQuotes: false,
+                  withLinks: true,
+                  bigNumbers: false,
+                  maxString: 500,
+                  numericSummary: 0
+              }, options);
+              jsonViewer.maxString = options.maxString;
+              return options;
+          }
+
+          /**
+           * Take over a tree the server already rendered (JSONIFY_VIEWER_MODE="server") or that was
+           * streamed in, nothing is re-rendered, the data is kept for refresh and long strings
+           */
+          jsonViewer.adopt = function(json, options) {
+              jsonViewer.data = json;
+              jsonViewer.options = withDefaults(options);
+              sparklines = true;  // server rendered summaries could only be drawn with the data
+              drawSparklines();
+          };
+
+          /**
+           * Incremental JSON scanner for the streaming viewer. Containers on the top two levels are opened
+           * as soon as they start, anything deeper comes out whole (JSON.parse) once it is complete.
+           * push() text as it arrives and end() once there is no more, handlers get
+           * open(frame), item(frame, pending, isLast) and close(frame).
+           */
+          function jsonStream(handlers) {
+              const OPEN_LEVELS = 2;
+              const STRUCTURE = /["{}\[\]]/g;
+              const SCALAR_END = /[,\]}\s]/g;
+              let buf = '', i = 0, start = 0;
+              let state = 'value';  // value, key, colon, after, skip, done
+              let frames = [];
+              let skip = null;  // the value being read whole: {kind, depth, inString}
+              let key = null;  // key of the object member being read
+              let pending = null;  // a member read but not handed out, the next ',' or bracket says if it was the last
+
+              function error(message) {
+                  throw new SyntaxError('JSON stream: ' + message + ' at ' + i);
+              }
+
+              // index just past the quote closing a string, -1 when it hasn't arrived yet
+              function stringEnd(from) {
+                  for (let j = from; ; j++) {
+                      j = buf.indexOf('"', j);
+                      if (j < 0) {
+                          return -1;
+                      }
+                      let k = j - 1;
+                      while (buf.charCodeAt(k) === 92) {
+                          k--;
+                      }
+                      if ((j - 1 - k) % 2 === 0) {
+                          return j + 1;
+                      }
+                  }
+              }
+
+              function open(isArray) {
+                  let parent = frames[frames.length - 1];
+                  let frame = {isArray: isArray, n: 0, parent: parent || null, key: null, path: ''};
+                  if (parent) {
+                      frame.key = parent.isArray ? null : key;
+                      frame.path = pathJoin(parent.path, parent.isArray ? parent.n : key);
+                      parent.n++;
+                  }
+                  frames.push(frame);
+                  handlers.open(frame);
+                  state = isArray ? 'value' : 'key';
+              }
+
+              function close() {
+                  let frame = frames.pop();
+                  handlers.close(frame);
+                  pending = {frame: frame};
+                  state = frames.length ? 'after' : 'done';
+              }
+
+              function value(text) {
+                  let frame = frames[frames.length - 1];
+                  let parsed = JSON.parse(text);
+                  if (frame) {
+                      pending = {key: frame.isArray ? null : key, index: frame.n++, value: parsed};
+                      state = 'after';
+                  } else {
+                      state = 'done';
+                  }
+              }
+
+              // read over a value taken whole, false when it continues past what has arrived
+              function skipValue(final) {
+                  if (skip.kind === 'scalar') {
+                      SCALAR_END.lastIndex = i;
+                      let m = SCALAR_END.exec(buf);
+                      if (!m && !final) {
+                          i = buf.length;
+                          return false;
+                      }
+                      i = m ? m.index : buf.length;
+                  } else {
+                      while (skip.kind === 'string' || skip.inString || skip.depth) {
+                          if (skip.kind === 'string' || skip.inString) {
+                              let end = stringEnd(i);
+                              if (end < 0) {
+                                  i = buf.length;
+                                  return false;
+                              }
+                              i = end;
+                              if (skip.kind === 'string') {
+                                  break;
+                              }
+                              skip.inString = false;
+                              continue;
+                          }
+                          STRUCTURE.lastIndex = i;
+                          let m = STRUCTURE.exec(buf);
+                          if (!m) {
+                              i = buf.length;
+                              return false;
+                          }
+                          i = m.index + 1;
+                          let c = m[0];
+                          if (c === '"') {
+                              skip.inString = true;
+                          } else if (c === '{' || c === '[') {
+                              skip.depth++;
+                          } else {
+                              skip.depth--;
+                          }
+                      }
+                  }
+                  skip = null;
+                  value(buf.slice(start, i));
+                  return true;
+              }
 
+              function run(final) {
+                  for (;;) {
+                      if (state === 'skip') {
+                          if (!skipValue(final)) {
+                              return;
+                          }
+                          continue;
+                      }
+                      let code = buf.charCodeAt(i);
+                      while (code === 32 || code === 10 || code === 13 || code === 9) {
+                          code = buf.charCodeAt(++i);
+                      }
+                      if (i >= buf.length) {
+                          return;
+                      }
+                      let c = buf[i];
+                      let frame = frames[frames.length - 1];
+                      if (state === 'value') {
+                          if (frame && frame.isArray && c === ']' && frame.n === 0) {
+                              i++;
+                              close();
+                          } else if ((c === '{' || c === '[') && frames.length < OPEN_LEVELS) {
+                              i++;
+                              open(c === '[');
+                          } else {
+                              start = i;
+                              if (c === '{' || c === '[') {
+                                  skip = {kind: 'container', depth: 1, inString: false};
+                              } else if (c === '"') {
+                                  skip = {kind: 'string', depth: 0, inString: false};
+                              } else {
+                                  skip = {kind: 'scalar', depth: 0, inString: false};
+                              }
+                              i = skip.kind === 'scalar' ? i : i + 1;
+                              state = 'skip';
+                          }
+                      } else if (state === 'key') {
+                          if (c === '}' && frame.n === 0) {
+                              i++;
+                              close();
+                              continue;
+                          }
+                          if (c !== '"') {
+                              error('expected a key');
+                          }
+                          let end = stringEnd(i + 1);
+                          if (end < 0) {
+                              return;
+                          }
+                          key = JSON.parse(buf.slice(i, end));
+                          i = end;
+                          state = 'colon';
+                      } else if (state === 'colon') {
+                          if (c !== ':') {
+                              error("expected ':'");
+                          }
+                          i++;
+                          state = 'value';
+                      } else if (state === 'after') {
+                          if (c === ',') {
+                              i++;
+                              handlers.item(frame, pending, false);
+                              state = frame.isArray ? 'value' : 'key';
+                          } else if (c === (frame.isArray ? ']' : '}')) {
+                              i++;
+                              handlers.item(frame, pending, true);
+                              close();
+                          } else {
+                              error("expected ',' or '" + (frame.isArray ? ']' : '}') + "'");
+                          }
+                      } else {
+                          error('unexpected data after the document');
+                      }
+                  }
+              }
+
+              return {
+                  frames: frames,
+                  push: function(text) {
+                      buf += text;
+                      run(false);
+                      // drop what has been read, keep the value in progress
+                      let keep = state === 'skip' ? start : i;
+                      buf = buf.slice(keep);
+                      i -= keep;
+                      start -= keep;
+                  },
+                  end: function() {
+                      run(true);
+                      if (state !== 'done') {
+                          error('unexpected end of data');
+                      }
+                  }
+              };
+          }
+
+          /**
+           * JSONIFY_VIEWER_MODE="stream": fetch the json and build the tree while it downloads.
+           * Items of the top two levels are added as soon as they're complete, once everything has
+           * arrived the parsed data is adopted like a server rendered tree.
+           * @return {text, etag}
+           */
+          jsonViewer.stream = async function(url, options) {
+              options = withDefaults(options);
+              longStrings = [];
+              numericArrays = [];
+              jsonViewer.options = options;
+              let element = document.querySelector("pre#json-renderer");
+              element.classList.add('json-document');
+
+              let response = await fetch(url, {headers: {'X-jsonify': 'application/json'}, cache: 'no-store', credentials: 'same-origin'});
+              if (!response.ok || !(response.headers.get('Content-Type') || '').includes('json')) {
+                  throw new Error(response.status + ' ' + response.statusText);
+              }
+
+              let painted = false;
+              function flush(frame) {
+                  if (frame.html) {
+                      frame.container.insertAdjacentHTML('beforeend', frame.html);
+                      frame.html = '';
+                      drawSparklines();
+                      if (!painted) {
+                          painted = true;
+                          performance.mark('jsonify-parse-end');
+                      }
+                  }
+              }
+
+              // items of a maybe numeric array past its first page, held back until it's clear whether it gets a summary
+              function numbers(frame, isLast) {
+                  for (let i = NUMERIC_PAGE; i < frame.numbers.length; i++) {
+                      let path = pathJoin(frame.path, i);
+                      frame.html += '<li data-path="' + htmlEscape(path) + '">' + itemHtml(null, frame.numbers[i], path, isLast && i === frame.numbers.length - 1, options) + '</li>';
+                  }
+                  frame.numbers = null;
+              }
+
+              let scanner = jsonStream({
+                  open: function(frame) {
+                      let brackets = frame.isArray ? '[<ol class="json-array"></ol>]' : '{<ul class="json-dict"></ul>}';
+                      frame.html = '';
+                      frame.numbers = frame.isArray && options.numericSummary > 0 ? [] : null;
+                      if (frame.parent) {
+                          if (frame.parent.numbers) {
+                              numbers(frame.parent, false);
+                          }
+                          flush(frame.parent);
+                          let label = frame.key === null ? '' : keyHtml(frame.key, options);
+                          frame.parent.container.insertAdjacentHTML('beforeend', '<li data-path="' + htmlEscape(frame.path) + '"><a href class="json-toggle">'
+                              + label + '</a>' + (frame.key === null ? '' : ': ') + brackets + '</li>');
+                          frame.li = frame.parent.container.lastElementChild;
+                          frame.container = frame.li.querySelector(':scope > ul, :scope > ol');
+                      } else {
+                          element.innerHTML = (options.rootCollapsable ? '<a href class="json-toggle"></a>' : '') + brackets;
+                          frame.li = null;
+                          frame.container = element.querySelector(':scope > ul, :scope > ol');
+                      }
+                  },
+                  item: function(frame, pending, isLast) {
+                      if (pending.frame) {
+                          // a container that was streamed in place, only its comma is missing
+                          if (!isLast) {
+                              setComma(pending.frame.li, true);
+                          }
+                          return;
+                      }
+                      if (frame.numbers && typeof pending.value === 'number') {
+                          frame.numbers.push(pending.value);
+                          if (frame.numbers.length > NUMERIC_PAGE) {
+                              return;
+                          }
+                      } else if (frame.numbers) {
+                          numbers(frame, false);
+                      }
+                      let path = pathJoin(frame.path, frame.isArray ? pending.index : pending.key);
+                      frame.html += '<li data-path="' + htmlEscape(path) + '">' + itemHtml(pending.key, pending.value, path, isLast, options) + '</li>';
+                  },
+                  close: function(frame) {
+                      if (frame.numbers && frame.numbers.length >= options.numericSummary) {
+                          // all numbers, the summary takes the place of the first page
+                          if (frame.li) {
+                              frame.li.innerHTML = itemHtml(frame.key, frame.numbers, frame.path, true, options);
+                          } else {
+                              element.innerHTML = (options.rootCollapsable ? '<a href class="json-toggle"></a>' : '') + json2html(frame.numbers, options);
+                          }
+                          drawSparklines();
+                          return;
+                      }
+                      if (frame.numbers) {
+                          numbers(frame, true);
+                      }
+                      flush(frame);
+                      if (!frame.container.children.length) {
+                          // empty, no toggle, as json2html has it
+                          let empty = frame.isArray ? [] : {};
+                          if (frame.li) {
+                              frame.li.innerHTML = itemHtml(frame.key, empty, frame.path, true, options);
+                          } else {
+                              element.innerHTML = json2html(empty, options);
+                          }
+                      }
+                  }
               });
+
+              const SLICE = 16384;
+              let parts = [];
+              let failed = null;
+              let decoder = new TextDecoder();
+              let reader = response.body.getReader();
+              let yielded = performance.now();
+              function feed(text) {
+                  parts.push(text);
+                  if (failed === null && text) {
+                      try {
+                          scanner.push(text);
+                          scanner.frames.forEach(flush);
+                      } catch (error) {
+                          failed = error;
+                      }
+                  }
+              }
+              for (;;) {
+                  let chunk = await reader.read();
+                  if (chunk.done) {
+                      break;
+                  }
+                  let text = decoder.decode(chunk.value, {stream: true});
+                  for (let k = 0; k < text.length; k += SLICE) {
+                      let first = !painted;
+                      feed(text.slice(k, k + SLICE));
+                      if ((first && painted) || performance.now() - yielded > 50) {
+                          // let the browser paint, straight away for the first items
+                          await new Promise(resolve => setTimeout(resolve));
+                          yielded = performance.now();
+                      }
+                  }
+              }
+              feed(decoder.decode());
+              if (failed === null) {
+                  try {
+                      scanner.end();
+                  } catch (error) {
+                      failed = error;
+                  }
+              }
+
+              let text = parts.join('');
+              let json = JSON.parse(text);
+              if (!painted) {
+                  performance.mark('jsonify-parse-end');
+              }
+              if (failed !== null || json === null || typeof json !== 'object') {
+                  // a scalar, or the scanner gave up on something JSON.parse takes, render it whole
+                  jsonViewer(json, options);
+              } else {
+                  jsonViewer.adopt(json, options);
+              }
+              return {text: text, etag: response.headers.get('ETag')};
+          };
+
+          function isObject(value) {
+              return value !== null && typeof value === 'object' && !Array.isArray(value);
+          }
+
+          function sameKeys(a, b) {
+              let keysA = Object.keys(a);
+              let keysB = Object.keys(b);
+              return keysA.length === keysB.length && keysA.every((key, i) => key === keysB[i]);
+          }
+
+          function setComma(li, comma) {
+              let last = li.lastChild;
+              let hasComma = last && last.nodeType === Node.TEXT_NODE && last.textContent.endsWith(',');
+              if (comma && !hasComma) {
+                  li.appendChild(document.createTextNode(','));
+              } else if (!comma && hasComma) {
+                  last.textContent = last.textContent.slice(0, -1);
+              }
+          }
+
+          function changed(li) {
+              li.classList.remove('json-changed');
+              void li.offsetWidth;  // restart the animation
+              li.classList.add('json-changed');
+          }
+
+          function sameShape(oldValue, newValue) {
+              let bothArrays = Array.isArray(oldValue) && Array.isArray(newValue);
+              let bothObjects = isObject(oldValue) && isObject(newValue) && sameKeys(oldValue, newValue);
+              return (bothArrays || bothObjects) && isCollapsable(oldValue) && isCollapsable(newValue);
+          }
+
+          /**
+           * Patch the children of a rendered <ul>/<ol> from old to new data, untouched nodes keep their expand/collapse state
+           */
+          function patchChildren(container, oldValue, newValue, path, options) {
+              let items = container.children;
+              if (Array.isArray(newValue)) {
+                  let common = Math.min(oldValue.length, newValue.length);
+                  for (let i = 0; i < common; i++) {
+                      patchItem(items[i], null, oldValue[i], newValue[i], pathJoin(path, i), i === newValue.length - 1, options);
+                  }
+                  // Removed from the end
+                  while (items.length > newValue.length) {
+                      items[items.length - 1].remove();
+                  }
+                  if (newValue.length < oldValue.length) {
+                      setComma(items[items.length - 1], false);
+                  }
+                  // Appended to the end
+                  if (newValue.length > oldValue.length) {
+                      setComma(items[items.length - 1], true);
+                      let html = '';
+                      for (let i = oldValue.length; i < newValue.length; i++) {
+                          let itemPath = pathJoin(path, i);
+                          html += '<li data-path="' + htmlEscape(itemPath) + '" class="json-changed">';
+                          html += itemHtml(null, newValue[i], itemPath, i === newValue.length - 1, options);
+                          html += '</li>';
+                      }
+                      container.insertAdjacentHTML('beforeend', html);
+                      drawSparklines();
+                  }
+                  let placeholder = container.nextElementSibling;
+                  if (placeholder && placeholder.classList.contains('json-placeholder')) {
+                      placeholder.innerText = placeholderText(container);
+                  }
+              } else {
+                  // by path, a server rendered tree has the keys in the json's order rather than javascript's
+                  let byPath = {};
+                  Array.from(items).forEach(li => byPath[li.dataset.path] = li);
+                  let keys = Object.keys(newValue);
+                  keys.forEach((key, i) => {
+                      let itemPath = pathJoin(path, key);
+                      let li = byPath[itemPath] || items[i];
+                      // the comma goes by where the <li> is, Object.keys puts integer-like keys first
+                      patchItem(li, key, oldValue[key], newValue[key], itemPath, li === container.lastElementChild, options);
+                  });
+              }
+          }
+
+          function patchItem(li, key, oldValue, newValue, path, isLast, options) {
+              let container = li.querySelector(':scope > ul.json-dict, :scope > ol.json-array');
+              if (container && sameShape(oldValue, newValue)) {
+                  patchChildren(container, oldValue, newValue, path, options);
+              } else if (oldValue !== newValue && !sameNumbers(oldValue, newValue)) {
+                  // A different value or shape, re-render just this node
+                  li.innerHTML = itemHtml(key, newValue, path, isLast, options);
+                  changed(li);
+                  drawSparklines();
+              }
+          }
+
+          // numeric arrays are summarized rather than patched, unchanged ones are left alone
+          function sameNumbers(oldValue, newValue) {
+              if (!Array.isArray(oldValue) || !Array.isArray(newValue) || oldValue.length !== newValue.length) {
+                  return false;
+              }
+              for (let i = 0; i < newValue.length; i++) {
+                  if (oldValue[i] !== newValue[i] || typeof newValue[i] !== 'number') {
+                      return false;
+                  }
+              }
+              return true;
+          }
+
+          /**
+           * Diff new data against what is rendered and patch only the nodes that changed.
+           * Falls back to a full render when the root changes shape.
+           */
+          jsonViewer.patch = function(json) {
+              let element = document.querySelector("pre#json-renderer");
+              let container = element.querySelector(':scope > ul.json-dict, :scope > ol.json-array');
+              if (container && sameShape(jsonViewer.data, json)) {
+                  patchChildren(container, jsonViewer.data, json, '', jsonViewer.options);
+                  jsonViewer.data = json;
+              } else if (sameNumbers(jsonViewer.data, json)) {
+                  jsonViewer.data = json;
+              } else {
+                  jsonViewer(json, jsonViewer.options);
+              }
           };
       })();
     </script>
@@ -792,13 +2601,24 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
         <div id="helpButtons" style="">
             <!-- <button id="clipboardCopy" data-target="#json-input" style="cursor: pointer;"> clipboardCopy </button> -->
             <div id="infoButton" style="margin-right: 0.1em;">
-                <button id="refreshPage" data-target="window" style="cursor: pointer;"> refreshPage</button>
+                <span id="jsonSelect" class="hidden" title="only this part of the data was sent, ?jsonify_select=">select <code></code> <a id="jsonSelectClear" href="" title="show everything">&times;</a></span>
+                <input id="jsonFilter" type="search" placeholder="filter" autocomplete="off" spellcheck="false" title="filter keys, values and paths">
+                <span id="jsonFilterCount"></span>
+                <button id="refreshPage" data-target="window" style="cursor: pointer;" title="fetch the data again and update the tree in place"> refreshPage</button>
+                <select id="autoRefresh" title="refresh every..." style="cursor: pointer;">
+                    <option value="0">auto off</option>
+                    <option value="2">2s</option>
+                    <option value="5">5s</option>
+                    <option value="10">10s</option>
+                    <option value="30">30s</option>
+                    <option value="60">60s</option>
+                </select>
                 <button id="clipboardRead" data-target="#json-input" style="cursor: pointer;"> clipboardRead </button>
                 <button id="localChange" data-target="#json-viewer" style="cursor: pointer;"> localChange</button>
                 <button id="toggleRaw" data-target="#json-viewer" style="cursor: pointer;"> toggleRaw</button>
                 <button id="openAll" data-target="a.json-toggle" style="cursor: pointer;"> openAll </button>
                 <button id="closeAll" data-target="a.json-toggle" style="cursor: pointer;"> closeAll </button>
-                <button id="downloadFile" style="cursor: pointer;">downloadFile
+                <button id="downloadFile" title="shift-click for compact json" style="cursor: pointer;">downloadFile
                   <a href="" id="downloadFile_target" style="display: none">click here to download your file</a>
                 </button>
                 <button id="clipboardCopy" data-target="#json-input" style="cursor: pointer;"> clipboardCopy </button>
@@ -813,8 +2633,9 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
               document.getElementById('infoToggle').addEventListener('click', infoToggle);
               document.getElementById('localChange').addEventListener('click', localChange);
               document.getElementById('toggleRaw').addEventListener('click', toggleRaw);
-              document.getElementById('downloadFile').addEventListener('click', () => downloadFile('file text', 'data.json', 'text/json'));
+              document.getElementById('downloadFile').addEventListener('click', (event) => downloadFile(event, 'data.json', 'text/json'));
               document.getElementById('refreshPage').addEventListener('click', refreshPage);
+              document.getElementById('autoRefresh').addEventListener('change', autoRefresh);
 
 
               async function clipboardCopy() {
@@ -828,6 +2649,8 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
                   // let text = document.querySelector("#json-input").value;
                   let text = await navigator.clipboard.readText();
                   element.innerHTML = text
+                  delete element.dataset.pretty
+                  element.dataset.local = "1"
                   document.querySelector('#json-viewer').click()
               }
 
@@ -856,32 +2679,387 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
               }
 
               async function localChange() {
+                  document.getElementById("json-input").dataset.local = "1";
                   document.querySelector('#json-viewer').click()
               }
 
+              var refreshEtag = null;
+              var refreshing = false;
+
+              /**
+               * Fetch the same url as json (conditional on the last ETag) and patch the tree in place,
+               * expand/collapse state survives. Falls back to a full reload if the fetch doesn't work out.
+               */
               async function refreshPage() {
-                  // document.querySelector('#json-viewer').click()
-                  self.location.replace(location['href'])
+                  if (refreshing) {
+                      return;
+                  }
+                  refreshing = true;
+                  try {
+                      let headers = {'X-jsonify': 'application/json'};
+                      if (refreshEtag) {
+                          headers['If-None-Match'] = refreshEtag;
+                      }
+                      let response = await fetch(location.href, {headers: headers, cache: 'no-store', credentials: 'same-origin'});
+                      if (response.status === 304) {
+                          getDate();
+                          return;
+                      }
+                      if (!response.ok || !(response.headers.get('Content-Type') || '').includes('json')) {
+                          return self.location.replace(location['href']);
+                      }
+                      refreshEtag = response.headers.get('ETag');
+                      let text = await response.text();
+                      let json = JSON.parse(text);
+                      let element = document.getElementById("json-input");
+                      element.value = text;
+                      delete element.dataset.pretty;
+                      delete element.dataset.local;
+                      jsonViewer.patch(json);
+                      jsonFilter.index(text);
+                      getDate();
+                  } catch (error) {
+                      console.log("jsonify refresh failed: " + error);
+                  } finally {
+                      refreshing = false;
+                  }
+              }
+
+              var autoRefreshTimer = null;
+
+              function autoRefresh() {
+                  clearInterval(autoRefreshTimer);
+                  let seconds = parseFloat(document.getElementById('autoRefresh').value);
+                  if (seconds > 0) {
+                      autoRefreshTimer = setInterval(() => {
+                          if (document.visibilityState === 'visible') {
+                              refreshPage();
+                          }
+                      }, seconds * 1000);
+                  }
               }
 
               async function toggleRaw() {                  
+                  prettyRaw();
                   document.getElementById("json-renderer").classList.toggle('hidden');
                   document.getElementById("json-input").classList.toggle('hidden');
               }
 
+              /**
+               * The server sends compact json, indent the raw text the first time someone wants to read it.
+               * Works on the text rather than JSON.parse/JSON.stringify so big numbers survive untouched.
+               * @return string
+               */
+              function prettyRaw() {
+                  let element = document.getElementById("json-input");
+                  if (element.dataset.pretty !== "1") {
+                      element.value = indentJson(element.value, '  ');
+                      element.dataset.pretty = "1";
+                  }
+                  return element.value;
+              }
+
+              function indentJson(text, indent) {
+                  let out = [], depth = 0, start = 0, inString = false;
+                  let newline = (n) => '\n' + indent.repeat(n);
+                  for (let i = 0; i < text.length; i++) {
+                      let ch = text[i];
+                      if (inString) {
+                          if (ch === '\\') {
+                              i++;
+                          } else if (ch === '"') {
+                              inString = false;
+                          }
+                          continue;
+                      }
+                      switch (ch) {
+                          case '"':
+                              inString = true;
+                              break;
+                          case '{':
+                          case '[':
+                              let next = i + 1;
+                              while (text[next] === ' ' || text[next] === '\t' || text[next] === '\r' || text[next] === '\n') {
+                                  next++;
+                              }
+                              if (text[next] === '}' || text[next] === ']') {
+                                  // keep {} and [] on one line, whitespace inside them dropped like JSON.stringify does
+                                  out.push(text.slice(start, i + 1), text[next]);
+                                  start = next + 1;
+                                  i = next;
+                                  break;
+                              }
+                              out.push(text.slice(start, i + 1), newline(++depth));
+                              start = i + 1;
+                              break;
+                          case '}':
+                          case ']':
+                              out.push(text.slice(start, i), newline(--depth), ch);
+                              start = i + 1;
+                              break;
+                          case ',':
+                              out.push(text.slice(start, i + 1), newline(depth));
+                              start = i + 1;
+                              break;
+                          case ':':
+                              out.push(text.slice(start, i + 1), ' ');
+                              start = i + 1;
+                              break;
+                          case ' ':
+                          case '\t':
+                          case '\r':
+                          case '\n':
+                              // drop existing whitespace, ie from a pretty printed RawFragment
+                              out.push(text.slice(start, i));
+                              start = i + 1;
+                              break;
+                      }
+                  }
+                  out.push(text.slice(start));
+                  return out.join('');
+              }
+
 
               document.getElementById('infoToggle').click()
+
+              // JSONIFY_AUTO_REFRESH
+              (function(seconds) {
+                  if (seconds > 0) {
+                      let select = document.getElementById('autoRefresh');
+                      if (!Array.from(select.options).some(e => parseFloat(e.value) === seconds)) {
+                          select.add(new Option(seconds + 's', seconds));
+                      }
+                      select.value = seconds;
+                      autoRefresh();
+                  }
+              })({{ auto_refresh }});
+
+              // JSONIFY_SELECT, show the projection the server applied, with a link back to everything
+              (function(enabled) {
+                  let select = new URLSearchParams(location.search).get('jsonify_select');
+                  if (enabled && select) {
+                      let badge = document.getElementById('jsonSelect');
+                      let url = new URL(location.href);
+                      url.searchParams.delete('jsonify_select');
+                      badge.querySelector('code').textContent = select;
+                      document.getElementById('jsonSelectClear').href = url.href;
+                      badge.classList.remove('hidden');
+                  }
+              })({{ 'true' if select else 'false' }});
             </script>
             <script type="text/javascript">
-              async function downloadFile(text, name, type) {
+              /**
+               * The server streams the file (?jsonify_download=pretty, shift/alt-click for compact) straight
+               * into the browser's download manager, the page never holds a second copy of a big payload.
+               * Only data pasted or edited in the page is saved from the textarea.
+               */
+              async function downloadFile(event, name, type) {
                 var a = document.getElementById("downloadFile_target");
-                var text_data = document.getElementById("json-input").value;
-                var file = new Blob([text_data], {type: type});
-                a.href = URL.createObjectURL(file);
-                a.download = name;
+                if (event && event.target === a) {
+                  return;  // the a.click() below bubbling up to the button
+                }
+                var input = document.getElementById("json-input");
+                if (input.dataset.local === "1") {
+                  var file = new Blob([prettyRaw()], {type: type});
+                  a.href = URL.createObjectURL(file);
+                  a.download = name;
+                } else {
+                  var url = new URL(location.href);
+                  url.searchParams.set('jsonify_download', event && (event.shiftKey || event.altKey) ? 'compact' : 'pretty');
+                  a.href = url.href;
+                  a.download = '';  // the server's Content-Disposition names the file
+                }
                 a.click();
               }
             </script>
+            <script type="text/javascript">
+              /**
+               * Filter - a word index of the keys and values (and a path lookup) is built once in a worker
+               * after each render, a query is a binary search per word and only toggles classes on the
+               * matching <li>, the tree is never re-rendered.
+               */
+              var jsonFilter = (function() {
+                  var FILTER_LIMIT = 5000;
+                  var worker = null;
+                  var pathIndex = null;
+                  var marked = [];
+                  var timer = null;
+
+                  function indexWorker() {
+                      var WORD = /[\p{L}\p{N}_]+/gu;
+                      var paths = [];
+                      var entries = new Map();   // path -> entry
+                      var postings = new Map();  // word -> entries holding it, ascending
+                      var words = [];            // postings' keys sorted, prefix lookups are a binary search
+
+                      function pathJoin(path, key) {
+                          return path + '/' + String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+                      }
+
+                      function add(text, entry) {
+                          var found = text.toLowerCase().match(WORD);
+                          if (found === null) {
+                              return;
+                          }
+                          for (var i = 0; i < found.length; i++) {
+                              var list = postings.get(found[i]);
+                              if (list === undefined) {
+                                  postings.set(found[i], [entry]);
+                              } else if (list[list.length - 1] !== entry) {
+                                  list.push(entry);
+                              }
+                          }
+                      }
+
+                      function walk(value, path, key) {
+                          var entry = paths.length;
+                          if (path !== '') {
+                              paths.push(path);
+                              entries.set(path, entry);
+                              add(key, entry);
+                          }
+                          if (value !== null && typeof value === 'object') {
+                              if (Array.isArray(value)) {
+                                  for (var i = 0; i < value.length; i++) {
+                                      walk(value[i], pathJoin(path, i), '');
+                                  }
+                              } else {
+                                  for (var k in value) {
+                                      if (Object.prototype.hasOwnProperty.call(value, k)) {
+                                          walk(value[k], pathJoin(path, k), k);
+                                      }
+                                  }
+                              }
+                          } else if (path !== '') {
+                              add(String(value), entry);
+                          }
+                      }
+
+                      // entries with a word starting with `word`
+                      function prefixed(word) {
+                          var low = 0, high = words.length;
+                          while (low < high) {
+                              var middle = (low + high) >> 1;
+                              if (words[middle] < word) {
+                                  low = middle + 1;
+                              } else {
+                                  high = middle;
+                              }
+                          }
+                          var found = new Set();
+                          for (var i = low; i < words.length && words[i].startsWith(word); i++) {
+                              postings.get(words[i]).forEach(e => found.add(e));
+                          }
+                          return found;
+                      }
+
+                      self.onmessage = function(event) {
+                          var message = event.data;
+                          if (message.text !== undefined) {
+                              paths = [];
+                              entries = new Map();
+                              postings = new Map();
+                              try {
+                                  walk(JSON.parse(message.text), '', '');
+                              } catch (error) {}
+                              words = Array.from(postings.keys()).sort();
+                              return;
+                          }
+                          var found = [];
+                          if (message.query[0] === '/') {
+                              // a JSON Pointer, straight to it
+                              if (entries.has(message.query)) {
+                                  found.push(entries.get(message.query));
+                              }
+                          } else {
+                              // every word of the query starts a word of the key or value
+                              var sets = (message.query.toLowerCase().match(WORD) || []).map(prefixed).sort((a, b) => a.size - b.size);
+                              if (sets.length) {
+                                  found = Array.from(sets[0]).filter(e => sets.every(set => set.has(e))).sort((a, b) => a - b);
+                              }
+                          }
+                          var hits = found.slice(0, message.limit).map(e => paths[e]);
+                          self.postMessage({query: message.query, hits: hits, count: found.length});
+                      };
+                  }
+
+                  function index(text) {
+                      pathIndex = null;
+                      if (!window.Worker) {
+                          return;
+                      }
+                      if (worker === null) {
+                          let source = '(' + indexWorker.toString() + ')()';
+                          worker = new Worker(URL.createObjectURL(new Blob([source], {type: 'text/javascript'})));
+                          worker.onmessage = (event) => show(event.data);
+                      }
+                      worker.postMessage({text: text});
+                      let query = document.getElementById('jsonFilter').value;
+                      if (query) {
+                          search(query);
+                      }
+                  }
+
+                  function search(query) {
+                      if (!query) {
+                          return show({query: '', hits: [], count: 0});
+                      }
+                      if (worker !== null) {
+                          worker.postMessage({query: query, limit: FILTER_LIMIT});
+                      }
+                  }
+
+                  function clear() {
+                      marked.forEach(e => e.classList.remove('json-match', 'json-hit'));
+                      marked = [];
+                  }
+
+                  function show(result) {
+                      if (result.query !== document.getElementById('jsonFilter').value) {
+                          return;  // stale, the user kept typing
+                      }
+                      let renderer = document.getElementById('json-renderer');
+                      let counter = document.getElementById('jsonFilterCount');
+                      clear();
+                      if (!result.query) {
+                          renderer.classList.remove('json-filtering');
+                          counter.innerText = '';
+                          return;
+                      }
+                      if (pathIndex === null) {
+                          pathIndex = new Map();
+                          renderer.querySelectorAll('li[data-path]').forEach(e => pathIndex.set(e.dataset.path, e));
+                      }
+                      result.hits.forEach(path => {
+                          let element = pathIndex.get(path);
+                          while (element === undefined && path) {
+                              // inside a numeric summary or a paged/lazy subtree, show what contains it
+                              path = path.slice(0, path.lastIndexOf('/'));
+                              element = pathIndex.get(path);
+                          }
+                          if (element === undefined) {
+                              return;
+                          }
+                          element.classList.add('json-hit');
+                          marked.push(element);
+                          while (element && !element.classList.contains('json-match')) {
+                              element.classList.add('json-match');
+                              marked.push(element);
+                              element = element.parentElement.closest('li');
+                          }
+                      });
+                      renderer.classList.add('json-filtering');
+                      counter.innerText = result.count + (result.count > result.hits.length ? ' matches, showing ' + result.hits.length : ' matches');
+                  }
+
+                  document.getElementById('jsonFilter').addEventListener('input', function() {
+                      clearTimeout(timer);
+                      timer = setTimeout(() => search(this.value), 60);
+                  });
+
+                  return {index: index, search: search};
+              })();
+            </script>
         </div>
     </section>
     <section>
@@ -903,8 +3081,13 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
       </p>
       <button id="json-viewer" title="run jsonViewer()" style="display: none">Transform to HTML</button>
     </section>
+    {% if mode == "server" %}
+    <pre id="json-renderer" class="json-editor-blackbord full-screen json-document" data-rendered="server">{{ tree }}</pre>
     <textarea id="json-input" autocomplete="off" class="hidden" spellcheck="false">{{ data }}</textarea>
-    <pre id="json-renderer" class="json-editor-blackbord full-screen"></pre>
+    {% else %}
+    <textarea id="json-input" autocomplete="off" class="hidden" spellcheck="false">{{ data }}</textarea>
+    <pre id="json-renderer" class="json-editor-blackbord full-screen"{% if mode == "stream" %} data-rendered="stream"{% endif %}></pre>
+    {% endif %}
     <section>
         <style type="text/css">
           @media only screen and (max-width: 600px) {
@@ -954,6 +3137,13 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
 <script type="text/javascript">
   (function() {
       function renderJson() {
+          var element = document.querySelector('#json-renderer');
+          if (element.dataset.rendered === 'stream') {
+              // the page came without the data, fetch it and render while it downloads
+              delete element.dataset.rendered;
+              return streamJson();
+          }
+          performance.mark('jsonify-parse-start');
           try {
               // var input = eval('(' + document.querySelector('#json-input').value + ')');
               var input = JSON.parse(document.querySelector('#json-input').value);
@@ -961,13 +3151,71 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
           } catch (error) {
               return alert("Cannot eval JSON: " + error);
           }
-          var options = {
+          var options = viewerOptions();
+          performance.mark('jsonify-parse-end');
+          if (element.dataset.rendered === 'server') {
+              // the tree came with the page, keep it
+              delete element.dataset.rendered;
+              jsonViewer.adopt(input, options);
+          } else {
+              jsonViewer(input, options);
+          }
+          performance.mark('jsonify-render-end');
+          jsonFilter.index(document.querySelector('#json-input').value);
+          return true;
+      }
+
+      function viewerOptions() {
+          return {
               collapsed: document.querySelector('#collapsed').checked,
               rootCollapsable: document.querySelector('#root-collapsable').checked,
               withQuotes: document.querySelector('#with-quotes').checked,
-              withLinks: document.querySelector('#with-links').checked
+              withLinks: document.querySelector('#with-links').checked,
+              maxString: {{ max_string }},
+              numericSummary: {{ numeric_summary|default(1000) }},
+              lazy: {{ 'true' if lazy else 'false' }}
+          };
+      }
+
+      async function streamJson() {
+          performance.mark('jsonify-parse-start');
+          try {
+              var result = await jsonViewer.stream(location.href, viewerOptions());
+          } catch (error) {
+              alert("Cannot load JSON: " + error);
+              return false;
+          }
+          document.querySelector('#json-input').value = result.text;
+          refreshEtag = result.etag;
+          performance.mark('jsonify-render-end');
+          jsonFilter.index(result.text);
+          return true;
+      }
+
+      /**
+       * Render timings for JsonifyTelemetry, sent once after the first render has painted.
+       * Only pages from an app with the extension installed have a url to send to.
+       */
+      function reportTelemetry(url) {
+          if (!url || !navigator.sendBeacon) {
+              return;
+          }
+          let duration = (name, start, end) => {
+              performance.measure(name, start, end);
+              return performance.getEntriesByName(name, 'measure').pop().duration;
           };
-          jsonViewer(input, options);
+          // two frames, the second callback runs once the rendered tree has been painted
+          requestAnimationFrame(() => requestAnimationFrame(() => {
+              performance.mark('jsonify-paint');
+              navigator.sendBeacon(url, JSON.stringify({
+                  path: location.pathname,
+                  bytes: document.querySelector('#json-input').value.length,
+                  parse_ms: duration('jsonify-parse', 'jsonify-parse-start', 'jsonify-parse-end'),
+                  render_ms: duration('jsonify-render', 'jsonify-parse-end', 'jsonify-render-end'),
+                  paint_ms: performance.getEntriesByName('jsonify-paint', 'mark').pop().startTime,
+                  nodes: document.querySelectorAll('#json-renderer li').length
+              }));
+          }));
       }
 
       // Generate on click
@@ -977,7 +3225,11 @@ JSONIFY_TEMPLATE_STRING = r"""<!doctype HTML>
       document.querySelector('p.options input[type=checkbox]').addEventListener('click', () => renderJson());
 
       // Display JSON sample on page load
-      renderJson()
+      Promise.resolve(renderJson()).then(rendered => {
+          if (rendered) {
+              reportTelemetry({{ telemetry|default('')|tojson }});
+          }
+      });
   })();
 </script>
 </html>"""
@@ -0,0 +1,299 @@
+""" Server side numbers for jsonify(), for sizing workers and spotting regressions
+
+    Counters and histograms for what jsonify() decided (viewer, json, binary...) and why,
+    how long serializing and building the response took, how big the bodies were, and how
+    often the user-agent/Accept classifiers and the viewer template were answered from cache.
+
+    Recording is a dict update under a lock, nothing is collected unless the extension is installed.
+
+    Gunicorn and other prefork servers: give every worker the same directory and each one writes
+    its numbers there (at most once a second, atomically, and at exit), a scrape sums them all. Empty the
+    directory when the service is (re)started, like prometheus_client's PROMETHEUS_MULTIPROC_DIR.
+    A forked worker starts from zero, nothing the master counted before the fork (--preload) is counted twice.
+
+    USEAGE:
+        from jsonify import JsonifyMetrics
+
+        metrics = JsonifyMetrics(app)  # or metrics.init_app(app)
+        # JsonifyMetrics(app, directory="/run/jsonify-metrics") or JSONIFY_METRICS_DIR for multiple workers
+
+        # prometheus text format on GET /_jsonify/metrics
+        metrics.snapshot()
+        # {"counters": {"jsonify_responses_total": {'kind="html",decided_by="user-agent"': 12, ...}},
+        #  "histograms": {"jsonify_serialize_seconds": {'kind="json"': {"count": 40, "p99": 0.005, ...}}}}
+"""
+
+import atexit
+import bisect
+import functools
+import json as _json
+import math
+import os
+import threading
+import time
+import typing as t
+import weakref
+
+from flask import current_app
+
+from .jsonify import _accept_quality, _accept_ranges, _binary_mimetype, _is_browser, _viewer_parts
+
+_SECONDS_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_BYTES_BOUNDS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+# name: (type, help, bounds)
+_FAMILIES = {
+    "jsonify_responses_total": ("counter", "jsonify() responses by kind and what decided it", None),
+    "jsonify_cache_hits_total": ("counter", "Cached classifier and viewer template lookups answered from cache", None),
+    "jsonify_cache_misses_total": ("counter", "Cached classifier and viewer template lookups that had to be worked out", None),
+    "jsonify_serialize_seconds": ("histogram", "Time serializing the data, buffered responses only", _SECONDS_BOUNDS),
+    "jsonify_render_seconds": ("histogram", "Time building the whole response, serializing included", _SECONDS_BOUNDS),
+    "jsonify_response_bytes": ("histogram", "Body size, buffered responses only", _BYTES_BOUNDS),
+}
+# the lru_caches on the hot path, hit rates say whether their sizes suit the traffic
+_CACHES = {
+    "is_browser": _is_browser,
+    "accept_ranges": _accept_ranges,
+    "accept_quality": _accept_quality,
+    "binary_mimetype": _binary_mimetype,
+    "viewer_parts": _viewer_parts,
+}
+
+
+class Histogram:
+    """ Observation counts per bucket (upper bounds, the last one open ended) plus count and sum """
+
+    def __init__(self, bounds: t.Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, counts: t.Sequence[int], total: float):
+        """ Add another histogram's counts, same bounds """
+        for i, count in enumerate(counts):
+            self.counts[i] += count
+        self.count += sum(counts)
+        self.sum += total
+
+    def quantile(self, q: float) -> float:
+        """ Upper bound of the bucket holding the q-th observation, inf past the last bound """
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == math.inf else f"{bound:g}"] = cumulative
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class JsonifyMetrics:
+    """ Flask extension, counts what jsonify() does and serves it in the prometheus text format
+
+    url: the scrape endpoint
+    directory: shared by the workers of one service, each writes its numbers there and a scrape adds them up.
+               Defaults to JSONIFY_METRICS_DIR (config, then environment), None keeps them in this process
+    interval: seconds between a worker's writes to the directory
+    """
+
+    def __init__(self, app=None, url: str = "/_jsonify/metrics", directory: t.Optional[str] = None, interval: float = 1.0):
+        self.url = url
+        self.directory = directory
+        self.interval = float(interval)
+        self.counters: t.Dict[t.Tuple[str, t.Tuple[t.Tuple[str, str], ...]], float] = {}
+        self.histograms: t.Dict[t.Tuple[str, t.Tuple[t.Tuple[str, str], ...]], Histogram] = {}
+        self.lock = threading.Lock()
+        self.writing = threading.Lock()
+        self.written = 0.0
+        self.timer: t.Optional[threading.Timer] = None
+        self.cache_base: t.Dict[str, t.Tuple[int, int]] = {}
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=functools.partial(_after_fork, weakref.ref(self)))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if self.directory is None:
+            self.directory = app.config.get("JSONIFY_METRICS_DIR") or os.environ.get("JSONIFY_METRICS_DIR") or None
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.write)  # the last numbers of a worker that is shut down
+        app.extensions["jsonify_metrics"] = self
+        app.add_url_rule(self.url, "jsonify_metrics", self.view)
+
+    def view(self):
+        return current_app.response_class(self.prometheus(), mimetype="text/plain", content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    def record(self, kind: str, decided_by: str, render: float, serialize: t.Optional[float] = None, size: t.Optional[int] = None):
+        """ One jsonify() response, called by jsonify itself. serialize/size are None when the body is streamed """
+        kind_label = (("kind", kind),)
+        with self.lock:
+            key = ("jsonify_responses_total", kind_label + (("decided_by", decided_by),))
+            self.counters[key] = self.counters.get(key, 0) + 1
+            for name, value in (("jsonify_render_seconds", render), ("jsonify_serialize_seconds", serialize), ("jsonify_response_bytes", size)):
+                if value is None:
+                    continue
+                histogram = self.histograms.get((name, kind_label))
+                if histogram is None:
+                    histogram = self.histograms[(name, kind_label)] = Histogram(_FAMILIES[name][2])
+                histogram.observe(value)
+        if self.directory is not None:
+            self._schedule()
+
+    def _schedule(self):
+        """ Write now when the last write is interval old, else once it is, so a worker that goes idle still writes its last numbers """
+        wait = self.interval - (time.monotonic() - self.written)
+        if wait <= 0:
+            return self.write()
+        with self.lock:
+            if self.timer is not None:
+                return
+            self.timer = threading.Timer(wait, self._flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _flush(self):
+        self.timer = None
+        self.write()
+
+    def _forked(self):
+        """ In a new worker: fresh locks and numbers, the lru_cache statistics it inherited become its baseline """
+        self.lock = threading.Lock()
+        self.writing = threading.Lock()
+        self.written = 0.0
+        self.timer = None
+        self.counters = {}
+        self.histograms = {}
+        self.cache_base = {}
+        for cache, function in _CACHES.items():
+            info = function.cache_info()
+            self.cache_base[cache] = (info.hits, info.misses)
+
+    def write(self):
+        """ This worker's numbers into the shared directory, replaced atomically so a scrape never reads half a file """
+        if not self.writing.acquire(blocking=False):
+            return  # another thread is writing them already
+        try:
+            self.written = time.monotonic()
+            path = os.path.join(self.directory, f"{os.getpid()}.json")
+            with open(path + ".tmp", "w") as f:
+                _json.dump(self._local(), f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass  # metrics are never worth failing a request over
+        finally:
+            self.writing.release()
+
+    def snapshot(self) -> dict:
+        """ {"counters": {name: {labels: value}}, "histograms": {name: {labels: histogram}}}, every worker's when there's a directory """
+        counters, histograms = self._collect()
+        result = {"counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].setdefault(name, {})[_labels(labels)] = value
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda e: e[0]):
+            result["histograms"].setdefault(name, {})[_labels(labels)] = histogram.snapshot()
+        return result
+
+    def prometheus(self) -> str:
+        """ The prometheus text exposition format, version 0.0.4 """
+        counters, histograms = self._collect()
+        lines = []
+        for name, (kind, description, _) in _FAMILIES.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (family, labels), value in sorted(counters.items()):
+                if family == name:
+                    lines.append(f"{name}{_braces(_labels(labels))} {value!r}")
+            for (family, labels), histogram in sorted(histograms.items(), key=lambda e: e[0]):
+                if family != name:
+                    continue
+                label = _labels(labels)
+                for bound, cumulative in histogram.snapshot()["buckets"].items():
+                    le = _labels((("le", bound),))
+                    lines.append(f"{name}_bucket{_braces(label + ',' + le if label else le)} {cumulative}")
+                lines.append(f"{name}_sum{_braces(label)} {histogram.sum!r}")
+                lines.append(f"{name}_count{_braces(label)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _local(self) -> dict:
+        """ This process's numbers in a json friendly shape, cache statistics read now """
+        with self.lock:
+            counters = [[name, labels, value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, labels, e.counts, e.sum] for (name, labels), e in self.histograms.items()]
+        for cache, function in _CACHES.items():
+            info = function.cache_info()
+            hits, misses = self.cache_base.get(cache, (0, 0))
+            counters.append(["jsonify_cache_hits_total", [["cache", cache]], max(info.hits - hits, 0)])
+            counters.append(["jsonify_cache_misses_total", [["cache", cache]], max(info.misses - misses, 0)])
+        return {"counters": counters, "histograms": histograms}
+
+    def _collect(self):
+        """ Summed over every worker's file, or just this process without a directory """
+        if self.directory is None:
+            parts = [self._local()]
+        else:
+            self.write()
+            parts = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        parts.append(_json.load(f))
+                except (OSError, ValueError):
+                    continue  # a worker that died mid write, or not ours
+
+        counters, histograms = {}, {}
+        for part in parts:
+            for name, labels, value in part.get("counters", ()):
+                key = (name, tuple(tuple(e) for e in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in part.get("histograms", ()):
+                if name not in _FAMILIES:
+                    continue
+                key = (name, tuple(tuple(e) for e in labels))
+                histogram = histograms.get(key)
+                if histogram is None:
+                    histogram = histograms[key] = Histogram(_FAMILIES[name][2])
+                if len(counts) == len(histogram.counts):
+                    histogram.merge(counts, total)
+        return counters, histograms
+
+
+def _after_fork(ref: "weakref.ref[JsonifyMetrics]"):
+    metrics = ref()
+    if metrics is not None:
+        metrics._forked()
+
+
+def _labels(labels: t.Iterable[t.Tuple[str, str]]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+def _braces(text: str) -> str:
+    return "{" + text + "}" if text else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
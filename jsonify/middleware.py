@@ -0,0 +1,128 @@
+""" WSGI middleware, the html viewer for any app that returns json
+
+    jsonify() only helps views that call it. Wrap the WSGI app instead and every `application/json`
+    response a browser asks for is shown in the viewer, whatever framework made it (Flask, Falcon, Django...).
+
+    The upstream body is streamed between the viewer's html prefix and suffix as it arrives, it's never
+    buffered or parsed. Requests that don't get the viewer (same decision as jsonify(): Accept,
+    Content-Type, X-jsonify, then the user-agent) go straight to the app, their json only gains a Vary header
+    so shared caches never mix it up with the html.
+
+    USEAGE:
+        from jsonify import JsonifyMiddleware
+
+        app.wsgi_app = JsonifyMiddleware(app.wsgi_app)        # flask
+        application = JsonifyMiddleware(get_wsgi_application())  # django wsgi.py
+        app = JsonifyMiddleware(falcon.App())                  # falcon
+"""
+
+import itertools
+import typing as t
+import urllib.parse
+
+from werkzeug.datastructures import EnvironHeaders, Headers
+from werkzeug.wsgi import ClosingIterator
+
+from .jsonify import _VARY, _VARY_UA, _download_name, _mimetype, _textarea_escape, _viewer_parts, _wants_html
+
+# describe the json body, not the html page it becomes
+_DROP_HEADERS = frozenset(("content-type", "content-length", "etag", "last-modified", "content-md5", "accept-ranges"))
+
+
+class JsonifyMiddleware:
+    """ Wraps a WSGI app, json responses to browsers are shown in the viewer
+
+    sniff_ua: fall back to guessing from the user-agent when Accept doesn't decide, like JSONIFY_UA_SNIFF
+    max_string, auto_refresh: as JSONIFY_MAX_STRING and JSONIFY_AUTO_REFRESH
+    """
+
+    def __init__(self, app: t.Callable, sniff_ua: bool = True, max_string: int = 500, auto_refresh: float = 0):
+        self.app = app
+        self.sniff_ua = sniff_ua
+        self.max_string = int(max_string)
+        self.auto_refresh = float(auto_refresh)
+
+    def __call__(self, environ: dict, start_response: t.Callable):
+        if environ.get("REQUEST_METHOD") == "HEAD" or not _wants_html(EnvironHeaders(environ), self.sniff_ua):
+            return self.app(environ, self._passthrough(start_response))
+
+        download = "jsonify_download" in urllib.parse.parse_qs(environ.get("QUERY_STRING", ""))
+        response = {}
+        written = []
+
+        def capture(status, headers, exc_info=None):
+            if exc_info is not None and response.get("started"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"], response["headers"] = status, headers
+            return written.append  # the legacy write() callable, kept in order ahead of the body
+
+        body = self.app(environ, capture)
+        chunks = iter(body)
+        first = []
+        if "status" not in response:
+            # the app starts the response on the first iteration
+            first = list(itertools.islice(chunks, 1))
+        status, headers = response["status"], response["headers"]
+        response["started"] = True
+        chunks = itertools.chain(written, first, chunks)
+
+        if not _is_viewable(status, headers):
+            start_response(status, headers)
+            return ClosingIterator(chunks, getattr(body, "close", None))
+
+        if download:
+            # the viewer's download button, the json as is with a file name
+            disposition = Headers()
+            disposition.set("Content-Disposition", "attachment", filename=_download_name(environ.get("PATH_INFO", "")))
+            start_response(status, headers + disposition.to_wsgi_list())
+            return ClosingIterator(chunks, getattr(body, "close", None))
+
+        prefix, suffix = _viewer_parts(max_string=self.max_string, auto_refresh=self.auto_refresh, select=False)
+        headers = [(k, v) for k, v in headers if k.lower() not in _DROP_HEADERS]
+        headers = _vary(headers + [("Content-Type", "text/html; charset=utf-8")], self.sniff_ua)
+        start_response(status, headers)
+        return ClosingIterator(_viewer(prefix, chunks, suffix), getattr(body, "close", None))
+
+    def _passthrough(self, start_response: t.Callable) -> t.Callable:
+        """ start_response for requests that don't get the viewer, json that could have gets the same Vary as the html """
+        def vary(status, headers, exc_info=None):
+            if _is_viewable(status, headers):
+                headers = _vary(headers, self.sniff_ua)
+            return start_response(status, headers, exc_info)
+        return vary
+
+
+def _is_viewable(status: str, headers: t.List[t.Tuple[str, str]]) -> bool:
+    """ A json body the viewer can show as is: utf-8, not compressed, not already an attachment """
+    if status[:3] in ("204", "304") or status[:1] == "1":
+        return False
+    content_type = ""
+    for name, value in headers:
+        name = name.lower()
+        if name == "content-type":
+            content_type = value
+        elif name in ("content-encoding", "content-disposition"):
+            return False
+    mimetype = _mimetype(content_type)
+    if mimetype != "application/json" and not mimetype.endswith("+json"):
+        return False
+    charset = content_type.partition("charset=")[2].strip().strip('"').lower()
+    return charset in ("", "utf-8", "utf8")
+
+
+def _vary(headers: t.List[t.Tuple[str, str]], sniff_ua: bool) -> t.List[t.Tuple[str, str]]:
+    """ The app's Vary plus the headers the html/json decision looks at, so shared caches keep the two apart """
+    vary = {}
+    for name, value in headers:
+        if name.lower() == "vary":
+            vary.update((e.strip().lower(), e.strip()) for e in value.split(",") if e.strip())
+    vary.update((e.lower(), e) for e in (_VARY_UA if sniff_ua else _VARY))
+    return [(k, v) for k, v in headers if k.lower() != "vary"] + [("Vary", ", ".join(sorted(vary.values())))]
+
+
+def _viewer(prefix: bytes, chunks: t.Iterable[bytes], suffix: bytes) -> t.Iterator[bytes]:
+    yield prefix
+    for chunk in chunks:
+        if chunk:
+            yield _textarea_escape(chunk)
+    yield suffix
@@ -0,0 +1,43 @@
+""" Flask JSONProvider so every json response goes through jsonify
+
+    Flask 2.2+ serializes dicts and lists returned from views with `app.json`,
+    it never calls jsonify(). Install the provider and `jsonify(...)`, `return {...}`
+    and `make_response(...)` all share the same encoder and html viewer decision.
+
+    USEAGE:
+        from flask import Flask
+        from jsonify import JsonifyProvider
+
+        Flask.json_provider_class = JsonifyProvider
+        app = Flask(__name__)
+
+        # or on an existing app
+        app.json = JsonifyProvider(app)
+"""
+
+import json as _json
+import typing as t
+
+from flask import has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+from .jsonify import _response, _splice_dumps
+
+
+class JsonifyProvider(DefaultJSONProvider):
+    """ DefaultJSONProvider with RawJSON/RawFragment support and the html viewer on responses
+
+    Settings are the same as DefaultJSONProvider (sort_keys, ensure_ascii, compact, mimetype),
+    the JSONIFY_* config still applies.
+    """
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return _splice_dumps(_json.dumps, obj, kwargs.pop("default", self.default), **kwargs)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        if not has_request_context():
+            # CLI commands, background jobs, app_context() tests, no request to decide on, plain json
+            return super().response(*args, **kwargs)
+        return _response(self._prepare_response_obj(args, kwargs))
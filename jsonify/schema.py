@@ -0,0 +1,250 @@
+""" Schema compiled serializers for hot endpoints
+
+    Endpoints that always return the same shape don't need json.dumps working out
+    the type of every value. Register the shape once and jsonify generates a specialized
+    encoder for it: key literals are precomputed, known fields skip the type dispatch,
+    and anything that doesn't match the schema falls back to the normal path.
+
+    USEAGE:
+        from typing import List, Optional, TypedDict
+        from jsonify import jsonify, schema
+
+        class User(TypedDict):
+            id: int
+            name: str
+            email: Optional[str]
+            tags: List[str]
+
+        @app.route("/users/<int:user_id>")
+        @schema(User)
+        def get_user(user_id):
+            return jsonify(users[user_id])
+
+    A schema is a TypedDict, a dataclass, or a small dict such as
+    {"id": int, "name": str, "tags": [str], "profile": {"age": int}}.
+
+    Field types: str, int, float, bool, None, Optional[X], List[X], Dict[str, X],
+    nested schemas, and Any (serialized the normal way).
+
+    Only compact output is compiled, pretty printed responses (debug mode) use the normal path.
+"""
+
+import dataclasses
+import functools
+import json as _json
+import typing as t
+
+from flask import g
+
+from .jsonify import _dumps, _json_options
+
+
+class _Mismatch(Exception):
+    """ The data doesn't have the shape of the schema """
+
+
+def schema(spec: t.Any) -> t.Callable:
+    """ View decorator, jsonify() responses from this view use the encoder compiled for spec """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g._jsonify_schema = _for_app(spec)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _for_app(spec: t.Any) -> t.Callable[[t.Any], t.Optional[str]]:
+    """ compile_schema() with the app's sort_keys/ensure_ascii, so the output matches json.dumps """
+    sort_keys, ensure_ascii = _json_options()
+    return compile_schema(spec, sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+
+
+_compiled: t.Dict[t.Tuple[int, bool, bool], t.Tuple[t.Any, t.Callable[[t.Any], t.Optional[str]]]] = {}
+
+
+def compile_schema(spec: t.Any, sort_keys: bool = True, ensure_ascii: bool = True) -> t.Callable[[t.Any], t.Optional[str]]:
+    """ A function that returns the compact json for a value of this schema, or None when the value doesn't match
+
+    Compiled once per schema and settings, dict schemas are cached by identity so define them at module level.
+    """
+    key = (id(spec), bool(sort_keys), bool(ensure_ascii))
+    cached = _compiled.get(key)
+    if cached is not None and cached[0] is spec:
+        return cached[1]
+
+    encode = _Compiler(sort_keys, ensure_ascii).compile(spec)
+
+    def encoder(value):
+        try:
+            return encode(value)
+        except (_Mismatch, KeyError, AttributeError):
+            return None
+
+    encoder.source = encode.source
+    _compiled[key] = (spec, encoder)
+    return encoder
+
+
+class _Compiler:
+    """ Generates the source of one encoder function for a schema """
+
+    def __init__(self, sort_keys: bool, ensure_ascii: bool):
+        self.sort_keys = sort_keys
+        self.ensure_ascii = ensure_ascii
+        self.names = 0
+        self.lines = []
+        self.literal = ""  # adjacent literals are merged into one append
+        self.literal_depth = 1
+        self.stack = []
+        self.namespace = {
+            "_Mismatch": _Mismatch,
+            "_str": _json.encoder.encode_basestring_ascii if ensure_ascii else _json.encoder.encode_basestring,
+            "_int": int.__repr__,
+            "_float": float.__repr__,
+            "_any": _any,
+        }
+
+    def compile(self, spec: t.Any) -> t.Callable[[t.Any], str]:
+        self.line("out = []", 1)
+        self.line("a = out.append", 1)
+        self.value(spec, "v0", 1)
+        self.line("return ''.join(out)", 1)
+        source = "def encode(v0):\n" + "\n".join(self.lines) + "\n"
+        exec(compile(source, f"<jsonify schema {_name(spec)}>", "exec"), self.namespace)
+        encode = self.namespace["encode"]
+        encode.source = source
+        return encode
+
+    def line(self, code: str, depth: int):
+        self.flush()
+        self.lines.append("    " * depth + code)
+
+    def lit(self, text: str, depth: int):
+        if self.literal and self.literal_depth != depth:
+            self.flush()
+        self.literal += text
+        self.literal_depth = depth
+
+    def flush(self):
+        if self.literal:
+            self.lines.append("    " * self.literal_depth + f"a({self.literal!r})")
+            self.literal = ""
+
+    def name(self, prefix: str) -> str:
+        self.names += 1
+        return f"{prefix}{self.names}"
+
+    def check(self, condition: str, depth: int):
+        self.line(f"if {condition}: raise _Mismatch", depth)
+
+    def value(self, spec: t.Any, var: str, depth: int):
+        """ code that appends the json for `var`, which should be a `spec` """
+        origin = t.get_origin(spec)
+        args = t.get_args(spec)
+
+        if spec is t.Any or spec is object or spec in self.stack:
+            self.line(f"a(_any({var}))", depth)
+        elif spec is None or spec is type(None):
+            self.check(f"{var} is not None", depth)
+            self.lit("null", depth)
+        elif spec is bool:
+            self.check(f"type({var}) is not bool", depth)
+            self.line(f"a('true' if {var} else 'false')", depth)
+        elif spec is int:
+            self.check(f"type({var}) is not int", depth)
+            self.line(f"a(_int({var}))", depth)
+        elif spec is float:
+            self.line(f"if type({var}) is int:", depth)
+            self.line(f"a(_int({var}))", depth + 1)
+            self.line(f"elif type({var}) is float and {var} - {var} == 0.0:", depth)  # not nan/inf
+            self.line(f"a(_float({var}))", depth + 1)
+            self.line("else:", depth)
+            self.line("raise _Mismatch", depth + 1)
+        elif spec is str:
+            self.check(f"type({var}) is not str", depth)
+            self.line(f"a(_str({var}))", depth)
+        elif origin is t.Union:
+            options = [e for e in args if e is not type(None)]
+            if len(options) != 1:
+                return self.line(f"a(_any({var}))", depth)
+            self.line(f"if {var} is None:", depth)
+            self.line("a('null')", depth + 1)
+            self.line("else:", depth)
+            self.value(options[0], var, depth + 1)
+            self.flush()
+        elif isinstance(spec, list) or origin in (list, t.List, tuple, t.Tuple) or spec in (list, tuple):
+            item = spec[0] if isinstance(spec, list) and spec else (args[0] if args and origin in (list, t.List) else t.Any)
+            self.array(item, var, depth)
+        elif origin in (dict, t.Dict) or spec is dict:
+            self.mapping(args[1] if len(args) == 2 else t.Any, var, depth)
+        elif isinstance(spec, dict) or dataclasses.is_dataclass(spec) or _is_typeddict(spec):
+            self.stack.append(spec)
+            self.fields(spec, var, depth)
+            self.stack.pop()
+        else:
+            # anything else is left to json.dumps
+            self.line(f"a(_any({var}))", depth)
+
+    def array(self, item: t.Any, var: str, depth: int):
+        index, element = self.name("i"), self.name("v")
+        self.check(f"type({var}) is not list and type({var}) is not tuple", depth)
+        self.lit("[", depth)
+        self.line(f"for {index}, {element} in enumerate({var}):", depth)
+        self.line(f"if {index}: a(',')", depth + 1)
+        self.value(item, element, depth + 1)
+        self.flush()
+        self.lit("]", depth)
+
+    def mapping(self, item: t.Any, var: str, depth: int):
+        index, key, element = self.name("i"), self.name("k"), self.name("v")
+        items = f"sorted({var}.items())" if self.sort_keys else f"{var}.items()"
+        self.check(f"type({var}) is not dict", depth)
+        self.lit("{", depth)
+        self.line(f"for {index}, ({key}, {element}) in enumerate({items}):", depth)
+        self.check(f"type({key}) is not str", depth + 1)
+        self.line(f"a((',' if {index} else '') + _str({key}) + ':')", depth + 1)
+        self.value(item, element, depth + 1)
+        self.flush()
+        self.lit("}", depth)
+
+    def fields(self, spec: t.Any, var: str, depth: int):
+        if isinstance(spec, dict):
+            fields = list(spec.items())
+        else:
+            hints = t.get_type_hints(spec)
+            names = [e.name for e in dataclasses.fields(spec)] if dataclasses.is_dataclass(spec) else list(hints)
+            fields = [(name, hints.get(name, t.Any)) for name in names]
+        if self.sort_keys:
+            fields.sort(key=lambda e: e[0])
+
+        if dataclasses.is_dataclass(spec):
+            cls = self.name("_cls")
+            self.namespace[cls] = spec
+            self.check(f"type({var}) is not {cls}", depth)
+            access = lambda name: f"{var}.{name}"
+        else:
+            self.check(f"type({var}) is not dict or len({var}) != {len(fields)}", depth)
+            access = lambda name: f"{var}[{name!r}]"
+
+        element = self.name("v")
+        self.lit("{", depth)
+        for i, (name, field) in enumerate(fields):
+            # precomputed key literal, merged with the separator and any neighbouring literal
+            self.lit(("," if i else "") + _json.dumps(name, ensure_ascii=self.ensure_ascii) + ":", depth)
+            self.line(f"{element} = {access(name)}", depth)
+            self.value(field, element, depth)
+        self.lit("}", depth)
+
+
+def _any(value: t.Any) -> str:
+    """ Fields the schema doesn't pin down go through the normal jsonify serializer """
+    return _dumps(value, separators=(",", ":"))
+
+
+def _is_typeddict(spec: t.Any) -> bool:
+    return isinstance(spec, type) and issubclass(spec, dict) and hasattr(spec, "__total__")
+
+
+def _name(spec: t.Any) -> str:
+    return getattr(spec, "__name__", type(spec).__name__)
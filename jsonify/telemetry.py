@@ -0,0 +1,118 @@
+""" How long the viewer takes to parse and render, reported back by the browsers that use it
+
+    The viewer marks parse, render and first paint with performance.mark/measure, counts the tree's
+    nodes and sends them with navigator.sendBeacon once the page has painted. Only pages from an app
+    with the extension installed send anything.
+
+    Beacons are aggregated into histograms per flask endpoint and payload size, slow endpoints are
+    the ones that want lazy or virtualized viewing.
+
+    USEAGE:
+        from jsonify import JsonifyTelemetry
+
+        telemetry = JsonifyTelemetry(app)  # or telemetry.init_app(app)
+
+        telemetry.snapshot()
+        # {"users.list": {"<1MB": {"parse_ms": {"count": 12, "p50": 20.0, "p99": 50.0, ...}, "render_ms": ...}}}
+
+    In debug mode the histograms are also served on GET /_jsonify/telemetry (in the viewer of course).
+"""
+
+import json as _json
+import math
+import threading
+import typing as t
+
+from flask import current_app, request
+from werkzeug.exceptions import HTTPException
+
+from .jsonify import jsonify
+from .metrics import Histogram
+
+_MS_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+_NODE_BOUNDS = (10, 100, 1000, 10000, 100000, 1000000)
+_SIZE_BUCKETS = ((1e3, "<1KB"), (1e4, "<10KB"), (1e5, "<100KB"), (1e6, "<1MB"), (1e7, "<10MB"))
+_METRICS = {"parse_ms": _MS_BOUNDS, "render_ms": _MS_BOUNDS, "paint_ms": _MS_BOUNDS, "nodes": _NODE_BOUNDS}
+_MAX_BEACON = 4096
+
+
+class JsonifyTelemetry:
+    """ Flask extension, turns on the viewer's beacon and collects it
+
+    url: where the viewer sends its beacon, also the debug mode GET for the histograms
+    """
+
+    def __init__(self, app=None, url: str = "/_jsonify/telemetry"):
+        self.url = url
+        self.histograms: t.Dict[t.Tuple[str, str], t.Dict[str, Histogram]] = {}
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["jsonify_telemetry"] = self
+        app.add_url_rule(self.url, "jsonify_telemetry", self.view, methods=["GET", "POST"])
+
+    def view(self):
+        if request.method == "GET":
+            if not current_app.debug:
+                return "", 404
+            return jsonify(self.snapshot())
+
+        beacon = request.get_data(cache=False)
+        try:
+            if len(beacon) > _MAX_BEACON:
+                raise ValueError("beacon too large")
+            self.record(_json.loads(beacon))
+        except (ValueError, TypeError, AttributeError):
+            pass  # a beacon gets no answer worth sending
+        return "", 204
+
+    def record(self, beacon: dict):
+        """ Add one viewer beacon: {"path", "bytes", "parse_ms", "render_ms", "paint_ms", "nodes"}
+
+        ValueError for anything else, path and bytes are required and the rest must be measurements
+        """
+        if not isinstance(beacon, dict) or not isinstance(beacon.get("path"), str):
+            raise ValueError(f"not a beacon: {beacon!r:.100}")
+        endpoint = _endpoint(beacon["path"])
+        size = _size_bucket(_number(beacon.get("bytes")))
+        values = {name: _number(beacon[name]) for name in _METRICS if name in beacon}
+        with self.lock:
+            histograms = self.histograms.get((endpoint, size))
+            if histograms is None:
+                histograms = self.histograms[(endpoint, size)] = {name: Histogram(bounds) for name, bounds in _METRICS.items()}
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self) -> dict:
+        """ {endpoint: {size bucket: {metric: histogram}}} """
+        result = {}
+        with self.lock:
+            for (endpoint, size), histograms in sorted(self.histograms.items()):
+                result.setdefault(endpoint, {})[size] = {name: e.snapshot() for name, e in histograms.items()}
+        return result
+
+
+def _number(value: t.Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError(f"not a measurement: {value!r}")
+    return float(value)
+
+
+def _endpoint(path: str) -> str:
+    """ The flask endpoint the page came from, so /users/1 and /users/2 aggregate together """
+    if request.script_root and path.startswith(request.script_root):
+        path = path[len(request.script_root):]
+    try:
+        endpoint, _ = current_app.url_map.bind("", script_name=request.script_root).match(path, method="GET")
+    except HTTPException:
+        return "<unknown>"
+    return endpoint
+
+
+def _size_bucket(size: float) -> str:
+    for limit, label in _SIZE_BUCKETS:
+        if size < limit:
+            return label
+    return ">=10MB"
@@ -23,5 +23,7 @@ setup(name='jsonify',
       python_requires='>=3.8',
       extras_require={
         'testing': ["pytest"],
+        'msgpack': ["msgpack"],
+        'cbor': ["cbor2>=6"],
       },
       include_package_data=True)
\ No newline at end of file
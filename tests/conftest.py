@@ -0,0 +1,28 @@
+# pytest fixtures, run the suite from the repo root with `python -m pytest`
+
+import pytest
+from flask import Flask
+
+@pytest.fixture
+def app():
+    """ An app with the viewer on outside debug mode, routes are added by each test """
+    app = Flask(__name__)
+    app.config["JSONIFY_ALWAYS"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def chrome():
+    """ A desktop browser's User-Agent """
+    return "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+@pytest.fixture
+def browser(chrome):
+    """ The headers of a browser navigating to a page """
+    return {"User-Agent": chrome, "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
@@ -0,0 +1,332 @@
+# loadtest.py
+
+""" Load test a jsonify app with a mix of browser and API clients
+
+    Runs a sample app (like main.py) under a pre-forked stdlib WSGI server, one
+    single threaded worker per process like gunicorn's sync workers, then drives it
+    from client processes. Stdlib + flask only, runs offline on one linux box.
+
+    Client profiles:
+        - browser:   browser user agent + browser Accept header, gets the html viewer
+        - fetch:     browser user agent + `Content-Type: application/json`, gets json
+        - xjsonify:  browser user agent + `X-jsonify: application/json`, gets json
+        - api:       non browser user agent + `Accept: application/json`, gets json
+
+    Reports requests per second, p50/p99 latency and error rate per profile and payload size,
+    and the RSS of every worker.
+
+    --green runs one gevent worker (pip install gevent) and measures the latency of small requests
+    while other clients fetch a big payload, with JSONIFY_COOPERATIVE off and then auto detected.
+    Exits 1 when cooperative serialization doesn't bring the small request p99 down.
+
+    USEAGE:
+        python tests/loadtest.py
+        python tests/loadtest.py --workers 4 --clients 16 --duration 10
+        python tests/loadtest.py --mix browser=1,fetch=2,xjsonify=1,api=4 --sizes 10,1000,100000
+        python tests/loadtest.py --json > before.json
+        python tests/loadtest.py --green --sizes 20000 --duration 5
+"""
+
+import argparse
+import functools
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import statistics
+import sys
+import time
+import typing as t
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from jsonify import jsonify
+
+
+BROWSER_UA = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15"
+BROWSER_ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+
+PROFILES = {
+    "browser": {"User-Agent": BROWSER_UA, "Accept": BROWSER_ACCEPT},
+    "fetch": {"User-Agent": BROWSER_UA, "Accept": "*/*", "Content-Type": "application/json"},
+    "xjsonify": {"User-Agent": BROWSER_UA, "Accept": "*/*", "X-jsonify": "application/json"},
+    "api": {"User-Agent": "python-requests/2.28.1", "Accept": "application/json"},
+}
+
+
+def make_app() -> Flask:
+    """ main.py's index route plus /payload/<n> with n items, viewer on like a production JSONIFY_ALWAYS app """
+    app = Flask(__name__)
+    app.config["JSONIFY_ALWAYS"] = True
+
+    @app.route("/")
+    def index_route():
+        return jsonify({
+            "message": "Hello from a index endpoint! You don't need to be authenticated to see this.",
+            "endpoints": [f"http://localhost/api/{e}" for e in ("public", "private", "private-scoped", "optional")],
+        })
+
+    @app.route("/payload/<int:size>")
+    def payload_route(size):
+        return jsonify(payload(size))
+
+    return app
+
+
+@functools.lru_cache(maxsize=None)
+def payload(size: int) -> dict:
+    """ size items of a typical api shape, built once so only jsonify is measured """
+    rng = random.Random(size)
+    return {
+        "count": size,
+        "items": [
+            {
+                "id": i,
+                "name": f"item-{i}",
+                "price": round(rng.uniform(0, 1000), 2),
+                "active": rng.random() > 0.5,
+                "tags": rng.sample(["red", "green", "blue", "small", "large"], 2),
+                "url": f"http://localhost/api/items/{i}",
+            }
+            for i in range(size)
+        ],
+    }
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(app: Flask, sock: socket.socket):
+    """ Run one worker on an already listening socket, the kernel spreads accepts across workers """
+    server = WSGIServer(sock.getsockname(), QuietHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.server_name, server.server_port = sock.getsockname()[:2]
+    server.setup_environ()
+    server.set_app(app)
+    server.serve_forever()
+
+
+def start_workers(app: Flask, workers: int):
+    sock = socket.create_server(("127.0.0.1", 0), backlog=1024)
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:  # worker
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                serve(app, sock)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    return sock, pids
+
+
+def stop_workers(pids):
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def memory(pid: int) -> dict:
+    """ current and peak RSS in KiB from /proc """
+    result = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "VmHWM"):
+                result[name] = int(value.split()[0])
+    return result
+
+
+def client(port: int, seed: int, duration: float, warmup: float, mix: dict, sizes: list) -> list:
+    """ One client process, sequential requests until the duration is up
+
+    Returns (profile, size, latency seconds, ok) for every request after the warmup.
+    """
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    results = []
+    start = time.perf_counter()
+    while True:
+        now = time.perf_counter()
+        if now - start > warmup + duration:
+            break
+        profile = rng.choices(names, weights)[0]
+        size = rng.choice(sizes)
+        ok = False
+        began = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            conn.request("GET", f"/payload/{size}", headers=PROFILES[profile])
+            response = conn.getresponse()
+            body = response.read()
+            conn.close()
+            expect_html = profile == "browser"
+            ok = response.status == 200 and body and response.getheader("Content-Type", "").startswith("text/html") == expect_html
+        except (OSError, http.client.HTTPException):
+            pass
+        latency = time.perf_counter() - began
+        if now - start >= warmup:
+            results.append((profile, size, latency, ok))
+    return results
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(p) - 1]
+
+
+def summarize(results: list, duration: float) -> list:
+    groups = {}
+    for profile, size, latency, ok in results:
+        groups.setdefault((profile, size), []).append((latency, ok))
+    groups[("all", "-")] = [(latency, ok) for _, _, latency, ok in results]
+
+    rows = []
+    for (profile, size), values in sorted(groups.items(), key=lambda e: (e[0][0] == "all", str(e[0]))):
+        latencies = sorted(e[0] for e in values)
+        errors = sum(1 for e in values if not e[1])
+        rows.append({
+            "profile": profile,
+            "size": size,
+            "requests": len(values),
+            "rps": len(values) / duration,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "error_rate": errors / len(values) if values else 0.0,
+        })
+    return rows
+
+
+def green_worker(app: Flask, sock: socket.socket, cooperative: t.Optional[bool]):
+    """ One gevent worker, socket monkeypatched the way gunicorn's gevent worker does it """
+    from gevent import monkey
+    monkey.patch_socket()
+    from gevent.pywsgi import WSGIServer as GreenServer
+
+    import gevent.socket
+
+    app.config["JSONIFY_COOPERATIVE"] = cooperative
+    listener = gevent.socket.socket(sock.family, sock.type, fileno=sock.detach())
+    GreenServer(listener, app, log=None).serve_forever()
+
+
+def green_client(port: int, path: str, duration: float, warmup: float) -> list:
+    """ Sequential api requests to one path, returns the latencies after the warmup """
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < warmup + duration:
+        began = time.perf_counter()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("GET", path, headers=PROFILES["api"])
+        conn.getresponse().read()
+        conn.close()
+        if began - start >= warmup:
+            latencies.append(time.perf_counter() - began)
+    return latencies
+
+
+def green_check(size: int, duration: float, warmup: float, clients: int) -> bool:
+    """ p50/p99 of small requests on a single gevent worker that is also serializing `size` item payloads """
+    app = make_app()
+    payload(size)
+    print(f"{'cooperative':<12} {'path':<18} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    p99 = {}
+    for cooperative in (False, None):
+        sock = socket.create_server(("127.0.0.1", 0), backlog=1024)
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                green_worker(app, sock, cooperative)
+            finally:
+                os._exit(0)
+        port = sock.getsockname()[1]
+        paths = [f"/payload/{size}"] * max(1, clients // 4) + ["/"] * max(1, clients - clients // 4)
+        try:
+            with multiprocessing.get_context("fork").Pool(len(paths)) as pool:
+                results = pool.starmap(green_client, [(port, path, duration, warmup) for path in paths])
+        finally:
+            stop_workers([pid])
+            sock.close()
+
+        for path in sorted(set(paths)):
+            latencies = sorted(e for p, batch in zip(paths, results) if p == path for e in batch)
+            label = "auto" if cooperative is None else "off"
+            print(f"{label:<12} {path:<18} {len(latencies):>9} {percentile(latencies, 50) * 1000:>9.2f} {percentile(latencies, 99) * 1000:>9.2f}")
+            if path == "/":
+                p99[cooperative] = percentile(latencies, 99)
+    return p99[None] < p99[False]
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in PROFILES:
+            raise argparse.ArgumentTypeError(f"unknown profile {name!r}, choose from {', '.join(PROFILES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="server worker processes")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to measure, after the warmup")
+    parser.add_argument("--warmup", type=float, default=1, help="seconds before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("browser=1,fetch=1,xjsonify=1,api=1"), help="profile=weight,...")
+    parser.add_argument("--sizes", type=lambda v: [int(e) for e in v.split(",")], default=[10, 1000, 10000], help="payload item counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as json")
+    parser.add_argument("--green", action="store_true", help="check small request latency on a gevent worker instead")
+    args = parser.parse_args(argv)
+
+    if args.green:
+        sys.exit(0 if green_check(max(args.sizes), args.duration, args.warmup, args.clients) else 1)
+
+    app = make_app()
+    for size in args.sizes:
+        payload(size)  # build before forking so every worker shares it
+
+    sock, pids = start_workers(app, args.workers)
+    port = sock.getsockname()[1]
+    try:
+        with multiprocessing.get_context("fork").Pool(args.clients) as pool:
+            jobs = [(port, args.seed + i, args.duration, args.warmup, args.mix, args.sizes) for i in range(args.clients)]
+            results = [e for batch in pool.starmap(client, jobs) for e in batch]
+        workers = {pid: memory(pid) for pid in pids}
+    finally:
+        stop_workers(pids)
+        sock.close()
+
+    rows = summarize(results, args.duration)
+    if args.json:
+        print(json.dumps({"config": {k: v for k, v in vars(args).items() if k != "json"}, "results": rows, "workers": workers}, indent=2))
+        return
+
+    print(f"workers={args.workers} clients={args.clients} duration={args.duration}s mix={args.mix} sizes={args.sizes}")
+    print()
+    print(f"{'profile':<10} {'size':>7} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for row in rows:
+        print(f"{row['profile']:<10} {row['size']:>7} {row['requests']:>9} {row['rps']:>9.1f} {row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['error_rate']:>7.2%}")
+    print()
+    print(f"{'worker pid':<12} {'rss MiB':>9} {'peak MiB':>9}")
+    for pid, usage in workers.items():
+        print(f"{pid:<12} {usage.get('VmRSS', 0) / 1024:>9.1f} {usage.get('VmHWM', 0) / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
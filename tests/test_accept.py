@@ -0,0 +1,45 @@
+import pytest
+
+from jsonify import jsonify
+from jsonify.jsonify import _wants_html
+
+
+@pytest.mark.parametrize("accept, html", [
+    ("text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8", True),  # browser navigation
+    ("application/json", False),
+    ("text/html;q=0", False),
+    ("text/html;q=0, */*", False),
+    ("application/json, text/plain, */*", False),  # axios
+    ("application/json, text/html", False),
+    ("text/html, */*", True),
+    ("text/html;q=0.5, application/json", False),
+    ("text/html, application/json;q=0.5", True),
+    ("text/*", True),  # json not acceptable at all
+])
+def test_accept_decides(chrome, accept, html):
+    assert _wants_html({"Accept": accept, "User-Agent": chrome}) is html
+
+
+@pytest.mark.parametrize("accept", ["*/*", ""])
+def test_user_agent_decides_when_neither_is_named(chrome, accept):
+    assert _wants_html({"Accept": accept, "User-Agent": chrome}) is True
+    assert _wants_html({"Accept": accept, "User-Agent": "python-requests/2.31"}) is False
+    assert _wants_html({"Accept": accept, "User-Agent": chrome}, sniff_ua=False) is False
+
+
+def test_json_headers_win(chrome):
+    assert _wants_html({"Accept": "text/html", "User-Agent": chrome, "Content-Type": "application/json"}) is False
+    assert _wants_html({"Accept": "text/html", "User-Agent": chrome, "X-jsonify": "application/json"}) is False
+
+
+@pytest.mark.parametrize("accept, mimetype", [
+    ("text/html;q=0", "application/json"),
+    ("text/html;q=0, */*", "application/json"),
+    ("application/json, text/plain, */*", "application/json"),
+    ("text/html,application/xhtml+xml,*/*;q=0.8", "text/html"),
+])
+def test_response(app, client, chrome, accept, mimetype):
+    app.route("/")(lambda: jsonify({"a": 1}))
+    response = client.get("/", headers={"Accept": accept, "User-Agent": chrome})
+    assert response.mimetype == mimetype
+    assert set(response.headers["Vary"].split(", ")) == {"Accept", "Content-Type", "X-jsonify", "User-Agent"}
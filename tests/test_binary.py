@@ -0,0 +1,51 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+
+from jsonify import jsonify, RawJSON
+
+msgpack = pytest.importorskip("msgpack")
+cbor2 = pytest.importorskip("cbor2")
+
+DATA = {
+    "n": 1,
+    "price": decimal.Decimal("1.50"),
+    "when": datetime.datetime(2020, 1, 2, 3, 4, 5),
+    "id": uuid.UUID(int=1),
+    "raw": RawJSON(b'{"a":[1,2]}'),
+}
+
+
+@pytest.fixture
+def get(app, client, chrome):
+    app.route("/")(lambda: jsonify(DATA))
+    return lambda accept: client.get("/", headers={"Accept": accept, "User-Agent": chrome})
+
+
+@pytest.mark.parametrize("accept, loads", [
+    ("application/msgpack", msgpack.unpackb),
+    ("application/x-msgpack", msgpack.unpackb),
+    ("application/cbor", cbor2.loads),
+])
+def test_same_values_as_json(get, accept, loads):
+    response = get(accept)
+    assert response.mimetype == accept
+    assert loads(response.get_data()) == json.loads(get("application/json").get_data())
+
+
+@pytest.mark.parametrize("accept, mimetype", [
+    ("*/*", "text/html"),  # a wildcard never picks a binary format
+    ("application/json, application/msgpack;q=0.5", "application/json"),
+    ("application/msgpack, application/json", "application/msgpack"),
+    ("application/msgpack;q=0.5, text/html", "text/html"),
+    ("application/cbor;q=0, application/json", "application/json"),
+])
+def test_negotiation(get, accept, mimetype):
+    assert get(accept).mimetype == mimetype
+
+
+def test_vary(get):
+    assert "Accept" in get("application/msgpack").headers["Vary"]
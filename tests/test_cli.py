@@ -0,0 +1,117 @@
+""" python -m jsonify, the mmapped document, its token scanner and the lazy skeleton """
+
+import json
+import random
+
+import pytest
+
+import jsonify.__main__ as cli
+from jsonify.__main__ import Document, _LAZY_KEY
+
+STRINGS = ["", "plain", 'q"uo\\te', "[{]}", '\\"]', "x,y:z", "é€😀", "\\\\", "line\nbreak", "a" * 40]
+
+
+def value(rng, depth=0):
+    r = rng.random()
+    if depth > 4 or r < 0.4:
+        return rng.choice([None, True, False, 0, -1.5, 1e21, 12345678901234567890, rng.choice(STRINGS)])
+    if r < 0.7:
+        return {rng.choice(STRINGS) + str(i): value(rng, depth + 1) for i in range(rng.randint(0, 8))}
+    return [value(rng, depth + 1) for _ in range(rng.randint(0, 8))]
+
+
+def resolve(document, node):
+    """ Replace every lazy placeholder with the subtree the viewer would fetch for it """
+    if isinstance(node, list):
+        out = []
+        for item in node:
+            lazy = item.get(_LAZY_KEY) if isinstance(item, dict) and len(item) == 1 else None
+            if lazy and lazy.get("more"):
+                out.extend(resolve(document, fetch(document, lazy)))
+            else:
+                out.append(resolve(document, item))
+        return out
+    if isinstance(node, dict):
+        if list(node) == [_LAZY_KEY]:
+            return resolve(document, fetch(document, node[_LAZY_KEY]))
+        out = {}
+        for key, item in node.items():
+            if key == "…" and isinstance(item, dict) and _LAZY_KEY in item:
+                out.update(resolve(document, fetch(document, item[_LAZY_KEY])))
+            else:
+                out[key] = resolve(document, item)
+        return out
+    return node
+
+
+def fetch(document, lazy):
+    body = document.subtree(lazy["start"], lazy["end"], lazy["type"], bool(lazy.get("more")), lazy.get("index", 0))
+    return json.loads(b"".join(body))
+
+
+@pytest.fixture
+def small(monkeypatch):
+    """ Tiny limits so every placeholder, page and scanner chunk boundary is hit """
+    monkeypatch.setattr(cli, "_INLINE", 8)
+    monkeypatch.setattr(cli, "_PAGE", 3)
+    monkeypatch.setattr(cli, "_SKIP_CHUNK", 7)
+    monkeypatch.setattr(cli, "_CHUNK", 5)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_skeleton_resolves_to_the_document(tmp_path, small, seed):
+    rng = random.Random(seed)
+    data = [value(rng) for _ in range(rng.randint(0, 10))] if seed % 2 else {f"k{i}": value(rng) for i in range(rng.randint(0, 10))}
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(data, indent=rng.choice([None, 1, "\t"]), ensure_ascii=bool(seed % 3)), encoding="utf-8")
+    document = Document(str(path))
+    assert b"".join(document.chunks()) == path.read_bytes()
+    assert resolve(document, json.loads(b"".join(document.skeleton()))) == data
+
+
+def test_ndjson(tmp_path, small):
+    lines = [{"a": [1, 2, 3, 4, 5]}, [], "s", {"b": {"c": "[{"}}, 7]
+    path = tmp_path / "events.ndjson"
+    path.write_bytes(b"\xef\xbb\xbf" + b"\n".join(json.dumps(e).encode() for e in lines) + b"\n\n")
+    document = Document(str(path), ndjson=True)
+    assert json.loads(b"".join(document.chunks())) == lines
+    assert resolve(document, json.loads(b"".join(document.skeleton()))) == lines
+
+
+@pytest.mark.parametrize("text", [b"", b"  ", b"12", b'"s"', b"[]", b"{}", b" [ ] "])
+def test_scalars_and_empty(tmp_path, text):
+    path = tmp_path / "data.json"
+    path.write_bytes(text)
+    skeleton = b"".join(Document(str(path)).skeleton()).strip()
+    assert (json.loads(skeleton) if skeleton else None) == (json.loads(text) if text.strip() else None)
+
+
+def test_subtree_rejects_bad_offsets(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text('{"a": [1, 2]}')
+    document = Document(str(path))
+    with pytest.raises(ValueError):
+        document.subtree(0, 1000)
+    with pytest.raises(ValueError):
+        document.subtree(2, 5)  # a string, not a container
+    with pytest.raises(ValueError):
+        document.subtree(1, 5, "bogus", more=True)
+    assert json.loads(b"".join(document.subtree(6, 12))) == [1, 2]
+
+
+def test_refresh_picks_up_a_new_file(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("[1]")
+    document = Document(str(path))
+    path.write_text("[1, 2]")
+    document.refresh()
+    assert json.loads(b"".join(document.chunks())) == [1, 2]
+
+
+def test_static_page(tmp_path):
+    path, output = tmp_path / "data.json", tmp_path / "data.html"
+    path.write_text('{"a": "</textarea>&"}')
+    cli.main([str(path), "-o", str(output)])
+    page = output.read_text()
+    assert "&lt;/textarea>&amp;" in page
+    assert page.count("</textarea>") == 1
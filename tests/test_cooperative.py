@@ -0,0 +1,91 @@
+""" Cooperative serialization, JSONIFY_COOPERATIVE and JSONIFY_COOPERATIVE_ITEMS """
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from jsonify import jsonify, schema
+from jsonify.jsonify import _is_large
+
+from loadtest import payload
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+API = {"User-Agent": "python-requests/2.31", "Accept": "application/json"}
+
+
+@pytest.mark.parametrize("data, large", [
+    (list(range(999)), False),
+    (list(range(1000)), True),
+    ({"count": 3, "items": list(range(997))}, False),  # 2 keys + 997 items
+    ({"count": 3, "items": list(range(996)), "more": [1]}, True),
+    ([[1] * 500, [1] * 500], True),
+    ({"a": {"b": list(range(5000))}}, False),  # only the top two levels are counted
+    ("x" * 10000, False),
+    (None, False),
+])
+def test_is_large(data, large):
+    assert _is_large(data, 1000) is large
+
+
+@pytest.mark.parametrize("size, streamed", [(10, False), (5000, True)])
+def test_only_large_data_is_streamed(app, client, size, streamed):
+    app.config["JSONIFY_COOPERATIVE"] = True
+    app.route("/")(lambda: jsonify(payload(size)))
+    response = client.get("/", headers=API)
+    assert ("Content-Length" not in response.headers) is streamed
+    assert response.get_json() == json.loads(json.dumps(payload(size)))
+
+
+def test_small_data_keeps_the_schema_encoder(app, client):
+    app.config["JSONIFY_COOPERATIVE"] = True
+    app.route("/")(schema({"a": int})(lambda: jsonify({"a": 1})))
+    response = client.get("/", headers=API)
+    assert response.get_data() == b'{"a":1}\n'
+    assert response.headers["Content-Length"] == "8"
+
+
+# one gevent hub, a big and a small request at once through the test client, prints the small one's latency
+GREEN = """
+import json, sys, time
+from gevent import monkey
+monkey.patch_all()
+import gevent
+sys.path[:0] = [{root!r}, {tests!r}]
+from loadtest import make_app, payload
+
+app = make_app()
+app.config["JSONIFY_COOPERATIVE"] = {cooperative}
+client = app.test_client()
+headers = {{"User-Agent": "python-requests/2.31", "Accept": "application/json"}}
+payload(20000)
+client.get("/payload/20000", headers=headers)  # warm up
+done = {{}}
+
+def get(path):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200 and response.get_data()
+    done[path] = time.perf_counter() - started
+
+started = time.perf_counter()
+gevent.joinall([gevent.spawn(get, "/payload/20000"), gevent.spawn(get, "/")])
+print(json.dumps(done))
+"""
+
+
+def green(cooperative):
+    script = GREEN.format(root=os.path.dirname(TESTS), tests=TESTS, cooperative=cooperative)
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=120, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_small_request_is_not_blocked_by_a_big_one():
+    pytest.importorskip("gevent")
+    blocked, cooperative = green(False), green(None)
+    # without yielding the small request waits for the whole big one
+    assert blocked["/"] >= blocked["/payload/20000"]
+    # with it the small one is answered while the big one is still being serialized
+    assert cooperative["/"] < cooperative["/payload/20000"] / 5
+    assert cooperative["/"] < blocked["/"] / 5
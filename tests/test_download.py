@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from jsonify import jsonify, RawJSON
+
+DATA = {"b": [1, {"c": None}], "a": "é"}
+
+
+@pytest.fixture
+def download(app, client, browser):
+    app.route("/", defaults={"path": ""})(app.route("/<path:path>")(lambda path: jsonify(DATA)))
+    return lambda path="/", mode="pretty", headers=browser: client.get(f"{path}?jsonify_download={mode}", headers=headers)
+
+
+def test_pretty(download):
+    response = download()
+    body = response.get_data(as_text=True)
+    assert response.mimetype == "application/json"
+    assert body == json.dumps(DATA, indent=2, sort_keys=True, ensure_ascii=True, separators=(", ", ": ")) + "\n"
+    assert body.startswith('{\n  "a": "\\u00e9", \n  "b": [\n    1, \n    {\n      "c": null\n')
+
+
+def test_compact(download):
+    response = download(mode="compact")
+    assert response.get_data() == b'{"a":"\\u00e9","b":[1,{"c":null}]}\n'
+    # anything else is the pretty one
+    assert download(mode="yes").get_data() == download().get_data()
+
+
+@pytest.mark.parametrize("path, filename", [
+    ("/", "data.json"),
+    ("/users", "users.json"),
+    ("/users/", "users.json"),
+    ("/api/v1/users.json", "users.json"),
+    ("/report%20final", "report_final.json"),
+    ('/a%22b%3Bc', "abc.json"),
+    ("/..%2F..%2Fetc%2Fpasswd", "passwd.json"),
+    ("/%C3%A9t%C3%A9", "ete.json"),
+    ("/%E6%97%A5%E6%9C%AC", "data.json"),  # nothing ascii left
+    ("/.json", "json.json"),
+])
+def test_filename(download, path, filename):
+    response = download(path)
+    assert response.get_json() == DATA
+    assert response.headers["Content-Disposition"] == f"attachment; filename={filename}"
+
+
+def test_not_cached(download):
+    response = download()
+    response.close()
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in response.headers
+
+
+def test_browser_gets_the_file_not_the_viewer(download, browser):
+    # the browser's navigation Accept prefers text/html, a download is still the json
+    assert browser["Accept"].startswith("text/html")
+    response = download(headers=browser)
+    assert response.mimetype == "application/json"
+    assert response.headers["Content-Disposition"].startswith("attachment")
+    assert b"<html" not in response.get_data()
+
+
+def test_api_client(download):
+    response = download(headers={"Accept": "application/json"}, mode="compact")
+    assert response.headers["Content-Disposition"] == "attachment; filename=data.json"
+    assert json.loads(response.get_data()) == DATA
+
+
+def test_raw_json_as_it_came(app, client, browser):
+    app.route("/raw")(lambda: jsonify(RawJSON(b'{"z": 1,  "a": 2}')))
+    response = client.get("/raw?jsonify_download=pretty", headers=browser)
+    assert response.get_data() == b'{"z": 1,  "a": 2}'
+    assert response.headers["Content-Disposition"] == "attachment; filename=raw.json"
+
+
+def test_off_without_the_viewer(app, client, browser):
+    app.config["JSONIFY_ALWAYS"] = False
+    app.route("/")(lambda: jsonify(DATA))
+    response = client.get("/?jsonify_download=pretty", headers={"Accept": "application/json"})
+    assert "Content-Disposition" not in response.headers
@@ -0,0 +1,63 @@
+""" Peak memory of building a response, traced with tracemalloc against a bare json.dumps of the same data
+
+    Buffered responses may hold what json.dumps holds (its output and working memory) and nothing more,
+    streamed ones are serialized a chunk at a time and must stay far below it.
+"""
+
+import json
+import tracemalloc
+
+import pytest
+
+from jsonify import jsonify
+from loadtest import payload
+
+API = {"User-Agent": "python-requests/2.31", "Accept": "application/json"}
+SIZE = 20000  # items, ~2.5MB of json
+
+
+@pytest.fixture(scope="module")
+def data():
+    return payload(SIZE)
+
+
+@pytest.fixture(scope="module")
+def baseline(data):
+    """ json.dumps's peak, ~2.2x the serialized size """
+    tracemalloc.start()
+    json.dumps(data, separators=(",", ":"))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def peak(app, data, headers, path="/"):
+    """ Peak while jsonify() builds the response and its body is read a chunk at a time, as a server sends it """
+    with app.test_request_context(path, headers=headers):
+        jsonify(data)  # warm the caches, they aren't per request
+        tracemalloc.start()
+        response = jsonify(data)
+        size = sum(len(chunk) for chunk in response.response)
+        result = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    assert size > SIZE * 100
+    return result
+
+
+@pytest.mark.parametrize("kind", ["json", "html"])
+def test_buffered_holds_no_more_than_dumps(app, browser, data, baseline, kind):
+    headers = {"json": API, "html": browser}[kind]
+    assert peak(app, data, headers) <= baseline * 1.1
+
+
+@pytest.mark.parametrize("config, kind, path", [
+    ({"JSONIFY_COOPERATIVE": True}, "json", "/"),
+    ({"JSONIFY_COOPERATIVE": True}, "html", "/"),
+    ({"JSONIFY_VIEWER_MODE": "server"}, "html", "/"),
+    ({}, "html", "/?jsonify_download=compact"),
+    ({}, "html", "/?jsonify_download=pretty"),
+], ids=["chunked-json", "chunked-html", "server-tree", "download-compact", "download-pretty"])
+def test_streamed_stays_below_dumps(app, browser, data, baseline, config, kind, path):
+    app.config.update(config)
+    headers = {"json": API, "html": browser}[kind]
+    assert peak(app, data, headers, path) < baseline / 10
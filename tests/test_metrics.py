@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from jsonify import JsonifyMetrics, jsonify
+from jsonify.jsonify import _is_browser
+
+API = {"User-Agent": "python-requests/2.31", "Accept": "application/json"}
+
+
+@pytest.fixture
+def metrics(app):
+    app.route("/")(lambda: jsonify({"a": 1}))
+    return JsonifyMetrics(app)
+
+
+def test_counts_and_histograms(client, browser, metrics):
+    for headers in (browser, API, API, {"User-Agent": "curl/8"}):
+        client.get("/", headers=headers)
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["jsonify_responses_total"] == {
+        'kind="html",decided_by="accept"': 1,
+        'kind="json",decided_by="accept"': 2,
+        'kind="json",decided_by="user-agent"': 1,
+    }
+    assert snapshot["histograms"]["jsonify_render_seconds"]['kind="json"']["count"] == 3
+    assert snapshot["histograms"]["jsonify_response_bytes"]['kind="json"']["buckets"]["100"] == 3
+
+
+def test_prometheus(client, metrics):
+    client.get("/", headers=API)
+    response = client.get("/_jsonify/metrics")
+    text = response.get_data(as_text=True)
+    assert response.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert "# TYPE jsonify_responses_total counter" in text
+    assert 'jsonify_responses_total{kind="json",decided_by="accept"} 1' in text
+    assert 'jsonify_response_bytes_bucket{kind="json",le="+Inf"} 1' in text
+    assert 'jsonify_response_bytes_count{kind="json"} 1' in text
+
+
+def test_workers_are_summed(app, client, tmp_path):
+    app.route("/")(lambda: jsonify({"a": 1}))
+    metrics = JsonifyMetrics(app, directory=str(tmp_path))
+    client.get("/", headers=API)
+    # another worker's file, and a half written one that is skipped
+    (tmp_path / "1.json").write_text(json.dumps({
+        "counters": [["jsonify_responses_total", [["kind", "json"], ["decided_by", "accept"]], 4]],
+        "histograms": [["jsonify_render_seconds", [["kind", "json"]], [1] + [0] * 14, 0.0001]],
+    }))
+    (tmp_path / "2.json").write_text("{")
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["jsonify_responses_total"]['kind="json",decided_by="accept"'] == 5
+    assert snapshot["histograms"]["jsonify_render_seconds"]['kind="json"']["count"] == 2
+
+
+def test_idle_worker_writes_its_last_numbers(app, client, tmp_path):
+    app.route("/")(lambda: jsonify({"a": 1}))
+    JsonifyMetrics(app, directory=str(tmp_path), interval=0.2)
+    client.get("/", headers=API)
+    client.get("/", headers=API)  # within the interval, not written yet
+
+    def total():
+        with open(tmp_path / f"{os.getpid()}.json") as f:
+            return sum(value for name, _, value in json.load(f)["counters"] if name == "jsonify_responses_total")
+
+    assert total() == 1
+    time.sleep(0.4)
+    assert total() == 2
+
+
+def test_written_at_exit(tmp_path):
+    script = f"""
+import sys
+sys.path[:0] = [{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))!r}]
+from flask import Flask
+from jsonify import JsonifyMetrics
+app = Flask(__name__)
+metrics = JsonifyMetrics(app, directory={str(tmp_path)!r}, interval=3600)
+metrics.record("json", "accept", 0.001)
+metrics.record("json", "accept", 0.001)
+"""
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=60)
+    [name] = os.listdir(tmp_path)
+    with open(tmp_path / name) as f:
+        assert [e[2] for e in json.load(f)["counters"] if e[0] == "jsonify_responses_total"] == [2]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_starts_from_zero(app):
+    metrics = JsonifyMetrics(app)
+    metrics.record("json", "accept", 0.001)
+    _is_browser("before the fork")
+    _is_browser("before the fork")
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _is_browser("in the worker")
+            os.write(write, json.dumps(metrics.snapshot()["counters"]).encode())
+        finally:
+            os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as f:
+        counters = json.load(f)
+    os.waitpid(pid, 0)
+    assert "jsonify_responses_total" not in counters
+    assert counters["jsonify_cache_hits_total"]['cache="is_browser"'] == 0
+    assert counters["jsonify_cache_misses_total"]['cache="is_browser"'] == 1
+    assert metrics.snapshot()["counters"]["jsonify_responses_total"] == {'kind="json",decided_by="accept"': 1}
@@ -0,0 +1,93 @@
+import pytest
+from werkzeug.test import Client
+
+from jsonify import JsonifyMiddleware
+
+API = {"User-Agent": "python-requests/2.31", "Accept": "application/json"}
+BODY = b'{"a":"</textarea>&"}'
+
+
+def upstream(content_type="application/json", headers=(), closed=None):
+    def app(environ, start_response):
+        write = start_response("201 CREATED", [("Content-Type", content_type), ("Content-Length", str(len(BODY))), ("ETag", '"x"'), *headers])
+        write(BODY[:5])  # the legacy write() callable comes first
+        return Closing([BODY[5:]], closed)
+    return app
+
+
+class Closing(list):
+    def __init__(self, items, closed):
+        super().__init__(items)
+        self.closed = closed
+
+    def close(self):
+        if self.closed is not None:
+            self.closed.append(True)
+
+
+@pytest.fixture
+def get(browser):
+    """ Request through the middleware, as a browser unless headers are given """
+    def get(app, path="/items", headers=None, method="GET", **kwargs):
+        return Client(JsonifyMiddleware(app, **kwargs)).open(path, headers=browser if headers is None else headers, method=method)
+    return get
+
+
+def vary(response):
+    return set(response.headers["Vary"].split(", "))
+
+
+def test_viewer(get):
+    closed = []
+    response = get(upstream(headers=[("Vary", "Origin, accept")], closed=closed))
+    page = response.get_data(as_text=True)
+    assert response.status_code == 201
+    assert response.mimetype == "text/html"
+    assert "&lt;/textarea>&amp;" in page and page.count("</textarea>") == 1
+    assert "Content-Length" not in response.headers and "ETag" not in response.headers
+    assert vary(response) == {"Origin", "Accept", "Content-Type", "X-jsonify", "User-Agent"}
+    response.close()
+    assert closed == [True]
+
+
+@pytest.mark.parametrize("headers, method", [(API, "GET"), (None, "HEAD")], ids=["api", "browser-head"])
+def test_passthrough_json_gets_vary(get, headers, method):
+    response = get(upstream(headers=[("Vary", "Origin")]), headers=headers, method=method)
+    assert response.mimetype == "application/json"
+    assert response.headers["ETag"] == '"x"'
+    if method == "GET":
+        assert response.get_data() == BODY
+    assert vary(response) == {"Origin", "Accept", "Content-Type", "X-jsonify", "User-Agent"}
+
+
+def test_vary_without_user_agent_sniffing(get):
+    assert vary(get(upstream(), headers=API, sniff_ua=False)) == {"Accept", "Content-Type", "X-jsonify"}
+    assert vary(get(upstream(), sniff_ua=False)) == {"Accept", "Content-Type", "X-jsonify"}
+
+
+@pytest.mark.parametrize("content_type, headers", [
+    ("text/plain", ()),
+    ("application/json", [("Content-Encoding", "gzip")]),
+    ("application/json", [("Content-Disposition", "attachment")]),
+    ("application/json; charset=latin-1", ()),
+])
+def test_not_viewable_is_untouched(get, content_type, headers):
+    for request_headers in (None, API):
+        response = get(upstream(content_type, headers), headers=request_headers)
+        assert response.get_data() == BODY
+        assert response.headers["Content-Type"] == content_type
+        assert "Vary" not in response.headers
+
+
+@pytest.mark.parametrize("path, filename", [
+    ("/items", "items.json"),
+    ("/items.json", "items.json"),
+    ("/a/b/", "b.json"),
+    ("/", "data.json"),
+    ('/x";y=1;.json', "xy1.json"),
+    ("/../../etc/passwd", "passwd.json"),
+])
+def test_download_name(get, path, filename):
+    response = get(upstream(), path + "?jsonify_download=pretty")
+    assert response.get_data() == BODY
+    assert response.headers["Content-Disposition"] == f"attachment; filename={filename}"
@@ -0,0 +1,25 @@
+import json
+
+import flask
+
+from jsonify import JsonifyProvider, RawJSON
+
+
+def test_dict_return_gets_the_viewer(app, client, browser):
+    app.json = JsonifyProvider(app)
+    app.route("/")(lambda: {"a": 1})
+    assert client.get("/", headers=browser).mimetype == "text/html"
+    response = client.get("/", headers={"Accept": "application/json"})
+    assert response.mimetype == "application/json"
+    assert response.get_json() == {"a": 1}
+
+
+def test_without_a_request(app):
+    app.json = JsonifyProvider(app)
+    with app.app_context():
+        response = flask.jsonify({"a": [1, 2]})
+        assert response.mimetype == "application/json"
+        assert json.loads(response.get_data()) == {"a": [1, 2]}
+
+        response = app.json.response({"raw": RawJSON(b'{"b":true}')})
+        assert json.loads(response.get_data()) == {"raw": {"b": True}}
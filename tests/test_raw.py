@@ -0,0 +1,156 @@
+import json
+
+import pytest
+
+from jsonify import jsonify, RawFragment, RawJSON
+from jsonify.jsonify import _FRAGMENT_TOKEN, _dumps, _iter_dumps, _looks_like_json
+
+API = {"Accept": "application/json"}
+
+
+def embedded(page):
+    """ The json in the viewer's <textarea>, still escaped """
+    start = page.index(">", page.index('id="json-input"')) + 1
+    return page[start:page.index("</textarea>", start)].rstrip("\n")
+
+
+@pytest.mark.parametrize("data", [
+    b'{"a": 1}', b"  [1, 2]\n", b'"s"', b"-1.5e3", b"0", b"true", b"false", b"null", b"{}", b"[]",
+])
+def test_looks_like_json(data):
+    assert _looks_like_json(data)
+
+
+@pytest.mark.parametrize("data", [
+    b"", b"  \n", b"{", b"[1, 2", b'{"a": 1]', b"<html>", b"undefined", b"1.", b"'s'",
+])
+def test_does_not_look_like_json(data):
+    assert not _looks_like_json(data)
+
+
+@pytest.mark.parametrize("data, stored", [
+    (b'{"a":1}', b'{"a":1}'),
+    ('{"é":"ü"}', '{"é":"ü"}'.encode("utf-8")),
+    (memoryview(b"[1]"), b"[1]"),
+])
+def test_bytes_and_str(data, stored):
+    assert RawJSON(data).data == stored
+    assert RawJSON(data, validate=True).data == stored
+    assert RawJSON(data, validate="full").data == stored
+
+
+def test_not_bytes():
+    with pytest.raises(TypeError):
+        RawJSON({"a": 1})
+
+
+def test_cheap_check_rejects():
+    with pytest.raises(ValueError):
+        RawJSON(b"<html></html>", validate=True)
+    # only the ends are looked at
+    assert RawJSON(b'{"a": nope}', validate=True).data == b'{"a": nope}'
+
+
+def test_full_check_rejects():
+    with pytest.raises(json.JSONDecodeError):
+        RawJSON(b'{"a": nope}', validate="full")
+    with pytest.raises(ValueError):
+        RawJSON("[1, 2", validate="full")
+
+
+def test_not_checked_by_default():
+    assert RawJSON(b"not json").data == b"not json"
+
+
+@pytest.mark.parametrize("data", [b' {"b": [1, 2],  "a": null} ', '["é", "\\u00e9"]'])
+def test_sent_as_is(app, client, data):
+    app.route("/")(lambda: jsonify(RawJSON(data)))
+    response = client.get("/", headers=API)
+    body = data.encode("utf-8") if isinstance(data, str) else data
+    assert response.mimetype == "application/json"
+    assert response.get_data() == body
+    assert response.headers["Content-Length"] == str(len(body))
+
+
+def test_viewer_escapes_textarea(app, client, browser):
+    data = b'{"a": "</textarea><script>alert(1)</script>", "b": "&lt;"}'
+    app.route("/")(lambda: jsonify(RawJSON(data)))
+    page = client.get("/", headers=browser).get_data(as_text=True)
+    assert page.count("</textarea>") == 1
+    assert "<script>alert(1)" not in page
+    assert embedded(page) == '{"a": "&lt;/textarea>&lt;script>alert(1)&lt;/script>", "b": "&amp;lt;"}'
+
+
+FRAGMENT = b'{"x" : [1,  2], "s": "</textarea>"}'  # its own spacing, kept as is
+
+
+def nested():
+    return {"user": 1, "items": [{"c": RawFragment(FRAGMENT)}, RawFragment(b'"two"'), [RawFragment(b"3")]]}
+
+
+COMPACT = b'{"items":[{"c":' + FRAGMENT + b'},"two",[3]],"user":1}\n'
+
+
+def test_fragment_compact(app, client):
+    app.route("/")(lambda: jsonify(nested()))
+    assert client.get("/", headers=API).get_data() == COMPACT
+
+
+def test_fragment_pretty(app, client):
+    app.config["JSONIFY_PRETTYPRINT_REGULAR"] = True
+    app.route("/")(lambda: jsonify(nested()))
+    assert client.get("/", headers=API).get_data().decode() == (
+        '{\n'
+        '  "items": [\n'
+        '    {\n'
+        '      "c": ' + FRAGMENT.decode() + '\n'
+        '    }, \n'
+        '    "two", \n'
+        '    [\n'
+        '      3\n'
+        '    ]\n'
+        '  ], \n'
+        '  "user": 1\n'
+        '}\n'
+    )
+
+
+def test_fragment_in_the_viewer(app, client, browser):
+    app.route("/")(lambda: jsonify(nested()))
+    page = client.get("/", headers=browser).get_data(as_text=True)
+    assert embedded(page) == COMPACT.decode().rstrip("\n").replace("<", "&lt;")
+
+
+@pytest.mark.parametrize("indent, separators", [(None, (",", ":")), (2, (", ", ": "))])
+def test_fragment_streamed(app, indent, separators):
+    # the chunked serializer walks the big containers itself, fragments come out the same
+    data = {"rows": [{"id": i, "raw": RawFragment(FRAGMENT)} for i in range(300)], "tail": RawFragment(b"[]")}
+    with app.test_request_context():
+        expected = _dumps(data, indent=indent, separators=separators)
+        chunks = list(_iter_dumps(data, indent, separators, chunk_size=100))
+    assert len(chunks) > 10
+    assert b"".join(chunks).decode() == expected
+    assert expected.count(FRAGMENT.decode()) == 300
+
+
+def test_fragments_keep_their_order(app, client):
+    app.route("/")(lambda: jsonify([RawFragment(str(i)) for i in range(12)]))
+    assert client.get("/", headers=API).get_data() == b"[0,1,2,3,4,5,6,7,8,9,10,11]\n"
+
+
+@pytest.mark.parametrize("lookalike", [
+    _FRAGMENT_TOKEN + "0",  # the real placeholder
+    _FRAGMENT_TOKEN + "1",
+    _FRAGMENT_TOKEN + "9",
+    "jsonify-fragment-0123456789abcdef-0",
+])
+def test_placeholder_in_the_data_is_kept(app, lookalike):
+    # "d" is past the levels _iter_dumps walks, its placeholder and the fragment come from one dumps call
+    data = {"a": lookalike, "b": RawFragment(b"[1]"), "c": [lookalike], "d": {"e": [lookalike, RawFragment(b"2")]}}
+    text = json.dumps(lookalike)
+    expected = '{"a":%s,"b":[1],"c":[%s],"d":{"e":[%s,2]}}' % (text, text, text)
+    with app.test_request_context():
+        assert _dumps(data, separators=(",", ":")) == expected
+        assert b"".join(_iter_dumps(data)).decode() == expected
+        # a string that is only a placeholder with no fragments around is nothing special either
+        assert _dumps([lookalike]) == json.dumps([lookalike])
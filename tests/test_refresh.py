@@ -0,0 +1,62 @@
+import pytest
+
+from jsonify import jsonify
+
+VARY = {"Accept", "Content-Type", "X-jsonify", "User-Agent"}
+
+
+@pytest.fixture
+def refresh(app, client, chrome):
+    """ The viewer's refresh: the same url as json with X-jsonify, conditional on the last ETag """
+    state = {"count": 1}
+    app.route("/")(lambda: jsonify(count=state["count"], items=list(range(state["count"]))))
+
+    def refresh(etag=None):
+        headers = {"User-Agent": chrome, "Accept": "*/*", "X-jsonify": "application/json"}
+        if etag:
+            headers["If-None-Match"] = etag
+        return client.get("/", headers=headers)
+
+    refresh.state = state
+    return refresh
+
+
+def test_not_modified(refresh):
+    first = refresh()
+    assert first.status_code == 200
+    assert first.get_json() == {"count": 1, "items": [0]}
+    etag = first.headers["ETag"]
+
+    response = refresh(etag)
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+    assert set(response.headers["Vary"].split(", ")) == VARY
+
+
+def test_changed(refresh):
+    etag = refresh().headers["ETag"]
+    refresh.state["count"] = 2
+    response = refresh(etag)
+    assert response.status_code == 200
+    assert response.get_json() == {"count": 2, "items": [0, 1]}
+    assert response.headers["ETag"] != etag
+    assert refresh(response.headers["ETag"]).status_code == 304
+
+
+def test_cooperative_body(app, refresh):
+    # chunked serialization still hashes the whole body
+    app.config.update(JSONIFY_COOPERATIVE=True, JSONIFY_COOPERATIVE_ITEMS=1, JSONIFY_COOPERATIVE_BYTES=16)
+    refresh.state["count"] = 100
+    first = refresh()
+    assert first.get_json()["items"] == list(range(100))
+    assert refresh(first.headers["ETag"]).status_code == 304
+
+
+def test_only_for_the_viewer(app, client, refresh):
+    # plain api requests aren't hashed
+    response = client.get("/", headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    etag = refresh().headers["ETag"]
+    assert client.get("/", headers={"Accept": "application/json", "If-None-Match": etag}).status_code == 200
@@ -0,0 +1,84 @@
+import dataclasses
+import json
+import typing as t
+
+import pytest
+
+from jsonify import compile_schema, jsonify, schema
+
+
+class User(t.TypedDict):
+    id: int
+    name: str
+    email: t.Optional[str]
+    tags: t.List[str]
+    scores: t.Dict[str, float]
+
+
+@dataclasses.dataclass
+class Point:
+    x: float
+    y: float
+    label: t.Any
+
+
+NESTED = {"id": int, "ok": bool, "profile": {"age": int, "nick": t.Optional[str]}, "items": [{"n": int}]}
+USER = {"id": 1, "name": "Zoë \"q\" </script>", "email": None, "tags": ["a", "b"], "scores": {"z": 1.5, "a": 2}}
+
+
+def dumps(value, sort_keys=True, ensure_ascii=True):
+    return json.dumps(value, separators=(",", ":"), sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+
+
+@pytest.mark.parametrize("sort_keys", [True, False])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("spec, value", [
+    (User, USER),
+    (User, dict(USER, email="a@b.c", tags=[], scores={})),
+    (NESTED, {"id": 2, "ok": False, "profile": {"age": 40, "nick": "x"}, "items": [{"n": 1}, {"n": 2}]}),
+    ([int], [1, 2, 3]),
+    ({"v": float}, {"v": 1e-7}),
+])
+def test_same_output_as_json_dumps(spec, value, sort_keys, ensure_ascii):
+    encode = compile_schema(spec, sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+    assert encode(value) == dumps(value, sort_keys, ensure_ascii)
+
+
+def test_any_uses_the_app_serializer(app):
+    with app.app_context():
+        encode = compile_schema({"any": t.Any, "n": int})
+        assert encode({"any": {"b": [1, None], "a": "é"}, "n": 1}) == dumps({"any": {"b": [1, None], "a": "é"}, "n": 1})
+
+
+def test_dataclass(app):
+    with app.app_context():
+        assert compile_schema(Point)(Point(1, 2.5, ["x"])) == dumps({"label": ["x"], "x": 1, "y": 2.5})
+        assert compile_schema(Point)({"x": 1, "y": 2, "label": None}) is None
+
+
+@pytest.mark.parametrize("value", [
+    dict(USER, id="1"),  # wrong type
+    dict(USER, id=True),  # bool is not an int
+    dict(USER, extra=1),  # unknown key
+    {k: v for k, v in USER.items() if k != "tags"},  # missing key
+    dict(USER, scores={"a": float("nan")}),  # not json
+    dict(USER, tags=[1]),
+    [USER],
+    None,
+])
+def test_mismatch_is_none(value):
+    assert compile_schema(User)(value) is None
+
+
+def test_compiled_once():
+    assert compile_schema(NESTED) is compile_schema(NESTED)
+
+
+@pytest.mark.parametrize("value", [USER, dict(USER, id="not an int")], ids=["match", "fallback"])
+def test_view(app, client, browser, value):
+    app.route("/")(schema(User)(lambda: jsonify(value)))
+    response = client.get("/", headers={"Accept": "application/json"})
+    assert response.get_data() == dumps(value).encode() + b"\n"
+    assert response.headers["Content-Length"] == str(len(response.get_data()))
+    # the viewer embeds the same json
+    assert client.get("/", headers=browser).mimetype == "text/html"
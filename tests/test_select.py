@@ -0,0 +1,77 @@
+import dataclasses
+
+import pytest
+
+from jsonify import jsonify, RawJSON
+
+API = {"Accept": "application/json"}
+
+
+@dataclasses.dataclass
+class Owner:
+    email: str
+    name: str
+
+
+DATA = {
+    "count": 2,
+    "a/b": {"~x": 1},
+    "items": [
+        {"id": 1, "name": "one", "owner": Owner("a@x.y", "A"), "tags": ["t"]},
+        {"id": 2, "name": "two", "owner": Owner("b@x.y", "B"), "extra": RawJSON(b'{"deep":[1,2]}')},
+    ],
+}
+
+
+@pytest.fixture
+def get(app, client):
+    app.config["JSONIFY_SELECT"] = True
+    app.route("/")(lambda: jsonify(DATA))
+    return lambda select, headers=API: client.get("/", query_string={"jsonify_select": select}, headers=headers)
+
+
+@pytest.mark.parametrize("select, expected", [
+    ("/count", 2),
+    ("/items/1/name", "two"),
+    ("/items/0/owner/email", "a@x.y"),
+    ("/a~1b/~0x", 1),
+    ("/items/1/extra/deep/1", 2),
+    ("count", {"count": 2}),
+    ("count,items.name", {"count": 2, "items": [{"name": "one"}, {"name": "two"}]}),
+    ("items.owner.email, items.id", {"items": [{"owner": {"email": "a@x.y"}, "id": 1}, {"owner": {"email": "b@x.y"}, "id": 2}]}),
+    ("items.extra.deep", {"items": [{}, {"extra": {"deep": [1, 2]}}]}),
+    ("missing", {}),
+])
+def test_select(get, select, expected):
+    response = get(select)
+    assert response.status_code == 200
+    assert response.get_json() == expected
+
+
+@pytest.mark.parametrize("select, status", [
+    ("/nope", 404),
+    ("/items/2", 404),
+    ("/items/01", 404),
+    ("/count/x", 404),
+    ("a..b", 400),
+    ("x" * 1025, 400),
+    (",".join(f"f{i}" for i in range(65)), 400),
+    (".".join(["a"] * 33), 400),
+    ("/" + "/".join(["a"] * 33), 400),
+])
+def test_bad_select(get, select, status):
+    assert get(select).status_code == status
+
+
+def test_off_by_default(app, client):
+    app.route("/")(lambda: jsonify(DATA))
+    response = client.get("/?jsonify_select=/count", headers=API)
+    assert response.get_json()["items"][0]["owner"] == {"email": "a@x.y", "name": "A"}
+
+
+def test_viewer_embeds_only_the_projection(get, browser):
+    page = get("count,items.id", browser).get_data(as_text=True)
+    assert 'id="jsonSelect"' in page
+    start = page.index('id="json-input"')
+    embedded = page[page.index(">", start) + 1:page.index("</textarea>", start)]
+    assert embedded.strip() == '{"count":2,"items":[{"id":1},{"id":2}]}'
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from jsonify import JsonifyTelemetry, jsonify
+
+
+@pytest.fixture
+def telemetry(app):
+    app.add_url_rule("/users/<int:id>", "users", lambda id: jsonify(id=id))
+    app.add_url_rule("/", "index", lambda: jsonify(a=1))
+    return JsonifyTelemetry(app)
+
+
+def send(client, beacon):
+    data = beacon if isinstance(beacon, str) else json.dumps(beacon)
+    return client.post("/_jsonify/telemetry", data=data)
+
+
+def test_aggregates_per_endpoint_and_size(client, telemetry):
+    for path, size, render_ms in [("/users/1", 500, 3), ("/users/2", 800, 30), ("/users/3", 5e5, 300), ("/", 10, 1), ("/nowhere", 10, 1)]:
+        response = send(client, {"path": path, "bytes": size, "parse_ms": 1, "render_ms": render_ms, "nodes": 50})
+        assert response.status_code == 204
+    snapshot = telemetry.snapshot()
+    assert {endpoint: sorted(sizes) for endpoint, sizes in snapshot.items()} == {
+        "users": ["<1KB", "<1MB"],
+        "index": ["<1KB"],
+        "<unknown>": ["<1KB"],
+    }
+    users = snapshot["users"]["<1KB"]
+    assert users["render_ms"]["count"] == 2
+    assert users["render_ms"]["sum"] == 33
+    assert users["nodes"]["buckets"]["100"] == 2
+    assert users["paint_ms"]["count"] == 0  # not in the beacon
+    assert snapshot["users"]["<1MB"]["render_ms"]["count"] == 1
+
+
+def test_path_under_the_script_root(app, telemetry):
+    with app.test_request_context("/_jsonify/telemetry", base_url="http://localhost/app/"):
+        telemetry.record({"path": "/app/users/7", "bytes": 2e7})
+    assert list(telemetry.snapshot()["users"]) == [">=10MB"]
+
+
+@pytest.mark.parametrize("beacon", [
+    "not json",
+    "[1, 2]",
+    '"/users/1"',
+    {"path": "/users/1"},  # no bytes
+    {"bytes": 100},  # no path
+    {"path": 1, "bytes": 100},
+    {"path": "/users/1", "bytes": "100"},
+    {"path": "/users/1", "bytes": -1},
+    {"path": "/users/1", "bytes": True},
+    {"path": "/users/1", "bytes": 100, "render_ms": None},
+    '{"path": "/users/1", "bytes": 100, "render_ms": NaN}',
+    {"path": "/users/1", "bytes": 100, "pad": "x" * 5000},  # too large
+])
+def test_bad_beacons_are_dropped(client, telemetry, beacon):
+    assert send(client, beacon).status_code == 204
+    assert telemetry.snapshot() == {}
+
+
+@pytest.mark.parametrize("beacon", [{"path": "/users/1"}, {"path": "/users/1", "bytes": "1"}, ["/users/1"]])
+def test_record_raises_value_error(app, telemetry, beacon):
+    with app.test_request_context("/_jsonify/telemetry"), pytest.raises(ValueError):
+        telemetry.record(beacon)
+
+
+def test_report_only_in_debug(app, client, telemetry):
+    send(client, {"path": "/", "bytes": 10, "render_ms": 2})
+    assert client.get("/_jsonify/telemetry").status_code == 404
+    app.debug = True
+    response = client.get("/_jsonify/telemetry", headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    assert response.get_json() == telemetry.snapshot()
+
+
+def test_viewer_sends_beacons(client, browser, telemetry):
+    assert 'reportTelemetry("/_jsonify/telemetry")' in client.get("/", headers=browser).get_data(as_text=True)
+
+
+def test_no_beacons_without_the_extension(app, client, browser):
+    app.route("/")(lambda: jsonify(a=1))
+    assert "/_jsonify/telemetry" not in client.get("/", headers=browser).get_data(as_text=True)
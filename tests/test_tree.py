@@ -0,0 +1,242 @@
+import json
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from jsonify import jsonify
+from jsonify.jsonify import _iter_tree, _tree_number
+
+
+@pytest.mark.parametrize("value, text", [
+    (0, "0"),
+    (-0.0, "0"),
+    (3.0, "3"),
+    (-2.5, "-2.5"),
+    (0.1, "0.1"),
+    (1e20, "100000000000000000000"),
+    (1e21, "1e+21"),
+    (1.5e300, "1.5e+300"),
+    (1e-6, "0.000001"),
+    (1e-7, "1e-7"),
+    (2 ** 53 - 1, "9007199254740991"),
+    (2 ** 53 + 1, "9007199254740992"),
+    (2 ** 60, "1152921504606847000"),
+    (10 ** 400, "Infinity"),
+    (float("nan"), "NaN"),
+    (float("-inf"), "-Infinity"),
+])
+def test_numbers_like_javascript(value, text):
+    # the same as String(n) in the browser
+    assert _tree_number(value) == text
+
+
+def test_server_tree_numbers(app, client, browser):
+    app.config["JSONIFY_VIEWER_MODE"] = "server"
+    app.route("/numbers")(lambda: jsonify(a=1.0, b=1e21))
+    body = client.get("/numbers", headers=browser).get_data(as_text=True)
+    assert '<span class="json-literal">1</span>' in body
+    assert '<span class="json-literal">1e+21</span>' in body
+
+
+def tree(data, max_string=0, numeric_summary=0, **kwargs):
+    return b"".join(_iter_tree(data, max_string, numeric_summary=numeric_summary, **kwargs)).decode()
+
+
+def test_nested(app):
+    with app.app_context():
+        assert tree({"b": [1, {"c": None}], "a": True, "e": [], "f": {}}) == (
+            '<a href class="json-toggle"></a>{<ul class="json-dict">'
+            '<li data-path="/a">a: <span class="json-literal json-bool">true</span>,</li>'
+            '<li data-path="/b"><a href class="json-toggle">b</a>: [<ol class="json-array">'
+            '<li data-path="/b/0"><span class="json-literal">1</span>,</li>'
+            '<li data-path="/b/1"><a href class="json-toggle"></a>{<ul class="json-dict">'
+            '<li data-path="/b/1/c">c: <span class="json-literal json-null">null</span></li>'
+            '</ul>}</li></ol>],</li>'
+            '<li data-path="/e">e: [],</li>'
+            '<li data-path="/f">f: {}</li>'
+            '</ul>}'
+        )
+        assert tree("s") == '<span class="json-string">"s"</span>'
+        assert tree([]) == "[]"
+
+
+def test_chunks(app):
+    data = {"rows": [{"id": i, "name": f"row {i}"} for i in range(200)]}
+    with app.app_context():
+        chunks = list(_iter_tree(data, 0, chunk_size=256))
+        assert len(chunks) > 20
+        assert b"".join(chunks).decode() == tree(data)
+
+
+def test_strings(app):
+    with app.app_context():
+        assert tree({"s": "x" * 12}, max_string=10) == (
+            '<a href class="json-toggle"></a>{<ul class="json-dict"><li data-path="/s">s: '
+            '<span class="json-string json-truncated" data-long-path="/s">"xxxxxxxxxx…"</span>'
+            '<a href class="json-expand" data-long-path="/s">12 chars</a></li></ul>}'
+        )
+        # at the limit it's shown whole
+        assert tree("x" * 10, max_string=10) == '<span class="json-string">"' + "x" * 10 + '"</span>'
+        assert tree("x" * 5000) == '<span class="json-string">"' + "x" * 5000 + '"</span>'
+        assert tree("y" * 1234, max_string=3).endswith(">1,234 chars</a>")
+        assert tree("https://e.com/?a=1&b=2") == (
+            '<a href="https://e.com/?a=1&amp;b=2" class="json-string" target="_blank" rel="noreferrer noopener">https://e.com/?a=1&amp;b=2</a>'
+        )
+
+
+def test_escaping(app):
+    with app.app_context():
+        html = tree({'<k a="1">&': '</pre><script>alert("x")</script>', "a/b~c": 1}, max_string=200)
+        assert "<script>" not in html and "</pre>" not in html and '<k a="1">' not in html
+        assert '<li data-path="/&lt;k a=&quot;1&quot;&gt;&amp;">&lt;k a=&quot;1&quot;&gt;&amp;: ' in html
+        assert '"&lt;/pre&gt;&lt;script&gt;alert(\\&quot;x\\&quot;)&lt;/script&gt;"' in html
+        # json pointer paths
+        assert '<li data-path="/a~1b~0c">a/b~c: ' in html
+        truncated = tree({"<b>": "<i>" * 10}, max_string=4)
+        assert 'data-long-path="/&lt;b&gt;">"&lt;i&gt;&lt;…"' in truncated
+
+
+def test_numeric_summary(app):
+    values = [1, 2.5, 3, -0.5, 1e21]
+    with app.app_context():
+        html = tree({"n": values, "m": [1, 2], "x": [1, "2", 3, 4, 5]}, numeric_summary=3)
+    assert (
+        '<li data-path="/n"><a href class="json-toggle">n</a>: [<span class="json-numeric" data-numeric-path="/n" data-count="5">'
+        '<span class="json-numeric-stats">5 numbers, min -0.5 max 1e+21 mean 200000000000000000000</span>'
+    ) in html
+    # too short, or not all numbers: items as usual
+    assert '<li data-path="/m/1"><span class="json-literal">2</span></li>' in html
+    assert '<li data-path="/x/1"><span class="json-string">"2"</span>,</li>' in html
+
+
+def page(client, browser, mode):
+    client.application.config["JSONIFY_VIEWER_MODE"] = mode
+    return client.get("/", headers=browser).get_data(as_text=True)
+
+
+def server_tree(html):
+    start = html.index(">", html.index('data-rendered="server"')) + 1
+    return html[start:html.index("</pre>", start)]
+
+
+DATA = {
+    "users": [{"id": i, "name": f"user <{i}>", "tags": ["a", "b"] if i % 2 else [], "home": "https://e.com/u?i=1&x=2"} for i in range(5)],
+    "k": {"a/b": 1, "t~": [[], {}], 'q"<': "x" * 40},
+    "n": [3.0, -0.0, 1e21, 1e-7, 2 ** 60, 0.1],
+    "ok": True,
+    "none": None,
+}
+
+
+@pytest.fixture
+def modes(app):
+    app.config.update(JSONIFY_MAX_STRING=20, JSONIFY_NUMERIC_SUMMARY=5)
+    app.route("/")(lambda: jsonify(DATA))
+
+
+def test_server_page(client, browser, modes):
+    html = page(client, browser, "server")
+    with client.application.app_context():
+        assert server_tree(html) == tree(DATA, max_string=20, numeric_summary=5)
+    # the json still follows for the raw view, copy and download
+    assert 'id="json-input"' in html
+
+
+def test_stream_page(client, browser, modes):
+    html = page(client, browser, "stream")
+    assert 'data-rendered="stream"' in html
+    start = html.index(">", html.index('id="json-input"')) + 1
+    assert html[start:html.index("</textarea>", start)].strip() == ""
+    # what the viewer then fetches
+    response = client.get("/", headers={"User-Agent": browser["User-Agent"], "Accept": "*/*", "X-jsonify": "application/json"})
+    assert response.mimetype == "application/json"
+    assert response.get_json() == json.loads(json.dumps(DATA))
+
+
+# A DOM just big enough for the viewer's json2html and stream: containers are filled with
+# insertAdjacentHTML, <li>s get innerHTML and commas, everything serializes back to markup.
+FAKE_DOM = r"""
+const fs = require('fs');
+global.Node = {TEXT_NODE: 3};
+function split(html) {
+  for (const empty of ['<ul class="json-dict"></ul>', '<ol class="json-array"></ol>']) {
+    let k = html.indexOf(empty);
+    if (k >= 0) {
+      let c = new Container(empty.slice(0, empty.indexOf('>') + 1), empty.slice(empty.indexOf('>') + 1));
+      return [html.slice(0, k), c, html.slice(k + empty.length)];
+    }
+  }
+  return null;
+}
+class Container {
+  constructor(open, close) { this.open = open; this.close = close; this.items = []; this.last = null; }
+  insertAdjacentHTML(where, html) {
+    let parts = split(html);
+    if (parts) { let li = new Li(parts); this.items.push(li); this.last = li; }
+    else { this.items.push(html); this.last = null; }
+  }
+  get lastElementChild() { return this.last; }
+  get children() { return {length: this.items.length}; }
+  serialize() { return this.open + this.items.map(e => typeof e === 'string' ? e : e.serialize()).join('') + this.close; }
+}
+class Li {
+  constructor(parts) {
+    this.head = parts[0]; this.container = parts[1]; this.tail = parts[2].slice(0, -5); this.raw = null;
+    this.liOpen = this.head.slice(0, this.head.indexOf('>') + 1); this.head = this.head.slice(this.liOpen.length);
+  }
+  querySelector() { return this.container; }
+  set innerHTML(v) { this.raw = v; this.tail = ''; }
+  get lastChild() { let self = this; return {nodeType: 3, get textContent() { return self.tail; }, set textContent(v) { self.tail = v; }}; }
+  appendChild(node) { this.tail += node.text; }
+  serialize() { return this.liOpen + (this.raw !== null ? this.raw + this.tail : this.head + this.container.serialize() + this.tail) + '</li>'; }
+}
+class Element {
+  constructor() { this.parts = null; this.html = ''; this.classList = {add() {}}; this.dataset = {}; }
+  set innerHTML(v) { this.parts = split(v); this.html = v; }
+  querySelector() { return this.parts[1]; }
+  serialize() { return this.parts ? this.parts[0] + this.parts[1].serialize() + this.parts[2] : this.html; }
+}
+let element = new Element();
+global.document = {addEventListener() {}, querySelectorAll() { return []; }, querySelector() { return element; }, createTextNode(t) { return {text: t}; }};
+
+const [script, body, options] = process.argv.slice(2).map(name => fs.readFileSync(name, 'utf8'));
+eval(script);
+(async () => {
+  let opts = JSON.parse(options);
+  jsonViewer(JSON.parse(body), Object.assign({}, opts));
+  let full = element.serialize();
+  // the body arrives a few bytes at a time
+  let bytes = Buffer.from(body), pieces = [];
+  for (let i = 0; i < bytes.length; i += 7) pieces.push(bytes.subarray(i, i + 7));
+  global.fetch = async () => ({ok: true, headers: {get: name => name === 'Content-Type' ? 'application/json' : null},
+    body: {getReader() { let k = 0; return {read: async () => k < pieces.length ? {done: false, value: pieces[k++]} : {done: true}}; }}});
+  element = new Element();
+  await jsonViewer.stream('/', Object.assign({}, opts));
+  console.log(JSON.stringify({full: full, streamed: element.serialize()}));
+})();
+"""
+
+
+def markup(html):
+    """ Entities as either side writes them, long strings and numeric arrays are found by path on the server
+    and by index in the browser
+    """
+    html = html.replace("&#34;", "&quot;").replace("&#39;", "&apos;").replace("&#x27;", "&apos;")
+    return re.sub(r'data-(long|numeric)(-path)?="[^"]*"', r'data-\1=""', html)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_same_tree_in_every_mode(client, browser, modes, tmp_path):
+    html = page(client, browser, "server")
+    script = re.findall(r"<script[^>]*>(.*?)</script>", page(client, browser, "stream"), re.S)[0]
+    body = client.get("/", headers={"Accept": "application/json"}).get_data(as_text=True)
+    files = {"dom.js": FAKE_DOM, "viewer.js": script, "data.json": body, "options.json": '{"maxString": 20, "numericSummary": 5}'}
+    for name, text in files.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    run = subprocess.run(["node", *(str(tmp_path / name) for name in files)], capture_output=True, text=True, timeout=60)
+    assert run.returncode == 0, run.stderr
+    rendered = json.loads(run.stdout)
+    assert markup(rendered["full"]) == markup(server_tree(html))
+    assert markup(rendered["streamed"]) == markup(server_tree(html))